@@ -18,7 +18,9 @@ def cli():
 @cli.command()
 @click.argument('file_path')
 @click.option('--domain', required=True)
-def process(file_path, domain):
+@click.option('--metric', type=click.Choice(['l2', 'ip']), default=None,
+              help='Index metric; "ip" scores normalized vectors by cosine similarity')
+def process(file_path, domain, metric):
     """Process a PDF into the specified domain's vectorstore"""
     try:
         print(f"\n=== DEBUG: Starting processing ===")
@@ -40,7 +42,227 @@ def process(file_path, domain):
             raise ValueError(f"Domain folder not found: {domain_path}")
             
         DomainManager.switch_domain(domain)
-        output_path = process_pdf(file_path, domain)
+        output_path = process_pdf(file_path, domain, metric=metric)
         click.echo(f"✅ Processed {Path(file_path).name} → {output_path}")
     except Exception as e:
-        click.secho(f"❌ Error: {str(e)}", fg='red')
\ No newline at end of file
+        click.secho(f"❌ Error: {str(e)}", fg='red')
+
+@cli.command()
+@click.argument('directory')
+@click.option('--domain', required=True)
+@click.option('--workers', type=int, default=None,
+              help='Worker processes that parse, split and embed (default: half the CPUs, max 4)')
+@click.option('--threads', 'threads_per_worker', type=int, default=1, show_default=True,
+              help='Math-library threads per worker; workers x threads should not exceed the CPUs')
+@click.option('--metric', type=click.Choice(['l2', 'ip']), default=None)
+@click.option('--stream', is_flag=True,
+              help='Single process, bounded memory: pages are parsed, embedded and written as a stream')
+@click.option('--dry-run', is_flag=True, help='Print what would be added, re-embedded or removed')
+def ingest(directory, domain, workers, threads_per_worker, metric, stream, dry_run):
+    """Sync a directory of PDFs into the domain's vectorstore (new/changed only, removed deleted)"""
+    try:
+        from app.backend.pipeline.ingest_manifest import ingest_directory
+
+        domain = domain.lower()
+        if not Path(directory).is_dir():
+            raise ValueError(f"Directory not found: {directory}")
+        DomainManager.switch_domain(domain)
+        result = ingest_directory(Path(directory), domain, workers=workers, threads_per_worker=threads_per_worker,
+                                  metric=metric, stream=stream, dry_run=dry_run)
+        if not dry_run:
+            plan = result["plan"]
+            click.echo(f"✅ {len(result['processed'])} PDFs ingested, {len(plan['removed'])} removed, "
+                       f"{len(plan['unchanged']) + len(plan['touched'])} unchanged")
+        for failed in result["failed"]:
+            click.secho(f"❌ {failed['pdf']}: {failed['error']}", fg='red')
+    except Exception as e:
+        click.secho(f"❌ Error: {str(e)}", fg='red')
+
+@cli.command()
+@click.option('--domain', required=True)
+@click.option('--queries-file', type=click.Path(exists=True), default=None,
+              help='Sample queries, one per line (defaults to sampled chunk text)')
+@click.option('--percentile', default=95.0, show_default=True,
+              help='Percentile of the random-chunk score distribution used as cutoff')
+def calibrate(domain, queries_file, percentile):
+    """Store a recommended score cutoff for the domain's vectorstore"""
+    try:
+        from app.backend.retriever.pdf.splitter import get_embedder
+        from app.backend.vector_store.calibration import calibrate_threshold
+        from app.backend.vector_store.faiss_store import get_vectorstore_path
+
+        queries = None
+        if queries_file:
+            with open(queries_file, 'r', encoding='utf-8') as f:
+                queries = [line.strip() for line in f if line.strip()]
+
+        result = calibrate_threshold(
+            get_embedder(),
+            str(get_vectorstore_path(domain.lower())),
+            queries=queries,
+            percentile=percentile
+        )
+
+        # Text histogram: random chunks (.) vs best hit per query (#)
+        hist = result['histogram']
+        noise_max = max(max(hist['noise']), 1)
+        top_max = max(max(hist['top1']), 1)
+        for i, edge in enumerate(hist['edges'][:-1]):
+            noise_bar = '.' * round(30 * hist['noise'][i] / noise_max)
+            top_bar = '#' * round(30 * hist['top1'][i] / top_max)
+            click.echo(f"{edge:8.3f} | {noise_bar:<30} | {top_bar}")
+        click.echo(f"✅ {result['metric']} cutoff {result['cutoff']:.4f} saved for {domain}")
+    except Exception as e:
+        click.secho(f"❌ Error: {str(e)}", fg='red')
+
+@cli.command()
+@click.option('--domain', required=True)
+@click.option('--queries-file', type=click.Path(exists=True), required=True,
+              help='Evaluation queries, one per line')
+@click.option('-k', default=3, show_default=True)
+@click.option('--rerank/--no-rerank', default=True,
+              help='Re-score compressed (SQ8/PQ) candidates against float16 vectors')
+def recall(domain, queries_file, k, rerank):
+    """Measure recall@k of the domain's index against exact float32 search"""
+    try:
+        from app.backend.retriever.pdf.splitter import get_embedder
+        from app.backend.vector_store.evaluation import recall_at_k
+        from app.backend.vector_store.faiss_store import get_vectorstore_path
+
+        with open(queries_file, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+        result = recall_at_k(
+            get_embedder(),
+            str(get_vectorstore_path(domain.lower())),
+            queries,
+            k=k,
+            search_kwargs={'rerank': rerank}
+        )
+        click.echo(f"Index types: {', '.join(result['index_types'])}")
+        click.echo(f"Bytes/vector: {result['bytes_per_vector']:.1f} "
+                   f"({result['compression']:.1f}x smaller than float32)")
+        click.echo(f"✅ recall@{k}: {result['recall']:.3f} over {result['queries']} queries")
+    except Exception as e:
+        click.secho(f"❌ Error: {str(e)}", fg='red')
+
+@cli.command()
+@click.option('--domain', required=True)
+@click.option('--verify/--no-verify', default=False,
+              help='Also check segment files against the manifest')
+@click.option('--deep', is_flag=True, help='Recompute checksums when verifying')
+def stats(domain, verify, deep):
+    """Print corpus composition from the vectorstore manifest (nothing is loaded)"""
+    try:
+        from app.backend.vector_store.faiss_store import get_vectorstore_path
+        from app.backend.vector_store.manifest import load_manifest
+        from app.backend.vector_store.segment_store import SegmentStore
+
+        persist_path = get_vectorstore_path(domain.lower())
+        manifest = load_manifest(persist_path)
+        if manifest is None:
+            raise FileNotFoundError(f"No manifest at {persist_path}; rebuild the vectorstore to create one")
+
+        total_bytes = sum(f['bytes'] for files in manifest['segments'].values() for f in files.values())
+        click.echo(f"Snapshot:   {manifest['snapshot']} (built {manifest['built_at']})")
+        click.echo(f"Embedder:   {manifest['embedder']} (dim {manifest['dimension']}, {manifest['metric']})")
+        click.echo(f"Vectors:    {manifest['vectors']} live / {manifest['rows']} stored")
+        click.echo(f"Segments:   {len(manifest['segments'])} "
+                   f"({', '.join(f'{t}: {n}' for t, n in sorted(manifest['index_types'].items()))})")
+        click.echo(f"Disk:       {total_bytes / 1e6:.1f} MB")
+        for filename, count in sorted(manifest['documents'].items(), key=lambda kv: -kv[1]):
+            click.echo(f"  {count:>7}  {filename}")
+
+        if verify:
+            problems = SegmentStore(persist_path).verify(deep=deep)
+            for problem in problems:
+                click.secho(f"❌ {problem}", fg='red')
+            if not problems:
+                click.echo("✅ Vectorstore matches its manifest")
+    except Exception as e:
+        click.secho(f"❌ Error: {str(e)}", fg='red')
+
+@cli.command()
+@click.option('--domain', required=True)
+@click.option('--index-type', type=click.Choice(['auto', 'flat', 'ivf_flat', 'ivf_pq', 'hnsw', 'sq8', 'pq']),
+              default='auto', show_default=True, help='Index type of the merged segment')
+def compact(domain, index_type):
+    """Merge the domain's small segments, drop deleted chunks and publish the result"""
+    try:
+        from app.backend.vector_store.faiss_store import compact_index
+
+        name = compact_index(domain.lower(), index_type=index_type)
+        if name is None:
+            click.echo("✅ Nothing to compact")
+        else:
+            click.echo(f"✅ Compacted into {name}")
+    except Exception as e:
+        click.secho(f"❌ Error: {str(e)}", fg='red')
+
+@cli.command()
+@click.option('--domain', required=True)
+@click.option('--sizes', default=None,
+              help='Comma-separated corpus sizes to simulate (defaults to the live corpus size)')
+@click.option('-k', default=3, show_default=True)
+def benchmark(domain, sizes, k):
+    """Compare NumPy float16/float32 exact search with FAISS IndexFlat"""
+    try:
+        from app.backend.vector_store.evaluation import benchmark_backends
+        from app.backend.vector_store.faiss_store import get_vectorstore_path
+
+        sizes = [int(s) for s in sizes.split(',')] if sizes else None
+        rows = benchmark_backends(str(get_vectorstore_path(domain.lower())), sizes=sizes, k=k)
+        click.echo(f"{'chunks':>8} {'flat ms':>8} {'np32 ms':>8} {'np16 ms':>8} {'np16 agree':>10} {'np16 MB':>8}")
+        for row in rows:
+            click.echo(f"{row['size']:>8} {row['flat_ms']:>8.3f} {row['numpy_float32_ms']:>8.3f} "
+                       f"{row['numpy_float16_ms']:>8.3f} {row['numpy_float16_agreement']:>10.3f} "
+                       f"{row['float16_mb']:>8.1f}")
+    except Exception as e:
+        click.secho(f"❌ Error: {str(e)}", fg='red')
+
+@cli.command('export-onnx')
+@click.option('--model', default=None, help='Hugging Face model id (defaults to the app embedder)')
+@click.option('--no-quantize', is_flag=True, help='Keep fp32 weights only')
+@click.option('--check/--no-check', default=True, show_default=True,
+              help='Compare against the PyTorch embedder on sample texts')
+def export_onnx(model, no_quantize, check):
+    """Export the embedding model to ONNX (int8 by default) for the experimental EMBEDDING_BACKEND=onnx"""
+    try:
+        from app.backend.retriever.pdf.onnx_embeddings import export_onnx as export, OnnxEmbeddings, cosine_agreement
+        from app.backend.retriever.pdf.splitter import DEFAULT_EMBEDDING_MODEL, get_embedder
+
+        model = model or DEFAULT_EMBEDDING_MODEL
+        output_dir = export(model, quantize=not no_quantize)
+        click.echo(f"✅ Exported {model} to {output_dir}")
+        if check:
+            texts = [
+                "How many vacation days do new employees get?",
+                "Expense reports must be submitted within 30 days.",
+                "The company matches 401(k) contributions up to 5% of salary.",
+            ]
+            onnx_embedder = OnnxEmbeddings(model, model_dir=output_dir, quantized=not no_quantize)
+            agreement = cosine_agreement(get_embedder(model, backend="torch"), onnx_embedder, texts)
+            click.echo(f"Cosine agreement vs PyTorch: mean {agreement['mean']:.4f}, min {agreement['min']:.4f}")
+    except Exception as e:
+        click.secho(f"❌ Error: {str(e)}", fg='red')
+
+@cli.command('embed-server')
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', default=8765, show_default=True)
+@click.option('--backend', type=click.Choice(['torch', 'onnx']), default='torch', show_default=True,
+              help='onnx is experimental until export-onnx --check passes')
+@click.option('--max-batch', default=64, show_default=True, help='Queries coalesced per forward pass')
+@click.option('--max-wait-ms', default=5.0, show_default=True, help='Time a query waits for others to join its batch')
+def embed_server(host, port, backend, max_batch, max_wait_ms):
+    """Serve the embedding model to every entry point (set EMBEDDING_BACKEND=service)"""
+    import time
+    from app.backend.retriever.pdf.embedding_service import serve
+    from app.backend.retriever.pdf.splitter import get_embedder
+
+    server = serve(get_embedder(backend=backend), host=host, port=port,
+                   max_batch=max_batch, max_wait_ms=max_wait_ms)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
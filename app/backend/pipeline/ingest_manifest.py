@@ -0,0 +1,141 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from app.backend.vector_store.manifest import file_checksum
+from app.backend.vector_store.segment_store import _atomic_write
+
+INGEST_MANIFEST_FILE = "ingested.json"
+
+
+class IngestManifest:
+    """Per-PDF record of what is in a domain's vectorstore.
+
+    Entries are keyed by filename (the segment document key) and hold path,
+    size, mtime, sha256, the chunk ids written and the embedder used. Size and
+    mtime are a fast path; a file is only hashed when one of them changed, so
+    touched-but-identical PDFs are recognized without re-embedding.
+    """
+
+    def __init__(self, vectorstore_path: Path):
+        self.path = Path(vectorstore_path) / INGEST_MANIFEST_FILE
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._hashes: Dict[Path, str] = {}
+        if self.path.exists():
+            self.entries = json.loads(self.path.read_text(encoding="utf-8"))["files"]
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(self.path, json.dumps({"version": 1, "files": self.entries}, indent=2))
+
+    def plan(self, pdf_files: List[Path], embedder: Optional[str] = None) -> Dict[str, List[Any]]:
+        """Classify PDFs as new / changed / touched / unchanged and list removed files.
+
+        touched PDFs have a new mtime but identical content. With embedder set,
+        every PDF recorded under a different embedder counts as changed.
+        """
+        plan: Dict[str, List[Any]] = {"new": [], "changed": [], "touched": [], "unchanged": [], "removed": []}
+        seen = set()
+        for pdf in sorted(pdf_files):
+            seen.add(pdf.name)
+            entry = self.entries.get(pdf.name)
+            if entry is None:
+                plan["new"].append(pdf)
+                continue
+            if embedder and entry.get("embedder") != embedder:
+                plan["changed"].append(pdf)
+                continue
+            stat = pdf.stat()
+            if stat.st_size == entry["size"] and stat.st_mtime == entry["mtime"]:
+                plan["unchanged"].append(pdf)
+            elif stat.st_size == entry["size"] and self._checksum(pdf) == entry["sha256"]:
+                plan["touched"].append(pdf)
+            else:
+                plan["changed"].append(pdf)
+        plan["removed"] = sorted(name for name in self.entries if name not in seen)
+        return plan
+
+    def _checksum(self, pdf: Path) -> str:
+        if pdf not in self._hashes:
+            self._hashes[pdf] = file_checksum(pdf)
+        return self._hashes[pdf]
+
+    def record(self, pdf: Path, chunk_ids: List[int], embedder: str) -> None:
+        stat = pdf.stat()
+        self.entries[pdf.name] = {
+            "path": str(pdf),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": self._checksum(pdf),
+            "chunk_ids": chunk_ids,
+            "embedder": embedder,
+            "ingested_at": datetime.now().isoformat(timespec="seconds"),
+        }
+
+    def touch(self, pdf: Path) -> None:
+        self.entries[pdf.name]["mtime"] = pdf.stat().st_mtime
+
+    def remove(self, name: str) -> None:
+        self.entries.pop(name, None)
+
+
+def print_plan(plan: Dict[str, List[Any]]) -> None:
+    for status in ("new", "changed", "touched", "removed"):
+        for item in plan[status]:
+            print(f"  {status:<9} {getattr(item, 'name', item)}")
+    print(f"🐞 [Ingest] {len(plan['new'])} new, {len(plan['changed'])} changed, "
+          f"{len(plan['touched'])} touched, {len(plan['unchanged'])} unchanged, {len(plan['removed'])} removed")
+
+
+def ingest_directory(
+    pdf_dir: Path,
+    domain: str,
+    workers: Optional[int] = None,
+    threads_per_worker: int = 1,
+    metric: Optional[str] = None,
+    stream: bool = False,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """Bring a domain's vectorstore in line with the PDFs in pdf_dir.
+
+    Only new or changed PDFs are embedded; chunks of PDFs that disappeared are
+    deleted; touched-but-identical PDFs only get their mtime refreshed. With
+    dry_run the plan is printed and nothing is written.
+    """
+    from app.backend.retriever.pdf.splitter import embedder_name
+    from app.backend.vector_store.faiss_store import get_vectorstore_path, delete_from_index
+
+    manifest = IngestManifest(get_vectorstore_path(domain))
+    embedder = embedder_name()
+    plan = manifest.plan(list(Path(pdf_dir).glob("*.pdf")), embedder)
+    print_plan(plan)
+    if dry_run:
+        return {"plan": plan, "processed": [], "failed": []}
+
+    for name in plan["removed"]:
+        delete_from_index(domain, name)
+        manifest.remove(name)
+    for pdf in plan["touched"]:
+        manifest.touch(pdf)
+
+    to_process = plan["new"] + plan["changed"]
+    failed: List[Dict[str, str]] = []
+    processed: List[str] = []
+    if to_process:
+        if stream:
+            from app.backend.pipeline.streaming_ingest import ingest_stream
+            result = ingest_stream(to_process, domain, metric=metric)
+        else:
+            from app.backend.pipeline.parallel_ingest import ingest_parallel
+            result = ingest_parallel(to_process, domain, workers=workers,
+                                     threads_per_worker=threads_per_worker, metric=metric)
+        failed = result["failed"]
+        failed_names = {f["pdf"] for f in failed}
+        for pdf in to_process:
+            if pdf.name not in failed_names:
+                # A PDF whose chunks all merged into another document's has no ids
+                manifest.record(pdf, result["chunk_ids"].get(pdf.name, []), embedder)
+                processed.append(pdf.name)
+    manifest.save()
+    return {"plan": plan, "processed": processed, "failed": failed}
@@ -0,0 +1,120 @@
+import json
+import os
+import pickle
+import shutil
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+SHARDS_DIR = "shards"
+
+
+def default_workers() -> int:
+    return max(1, min(4, (os.cpu_count() or 1) // 2))
+
+
+def _init_worker(domain: str, threads: int) -> None:
+    """Per-process setup: domain config and a bounded math-library thread budget"""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    import faiss
+    faiss.omp_set_num_threads(threads)
+
+    from app.backend.domains.manager import DomainManager
+    DomainManager.switch_domain(domain)
+
+
+def embed_shard(pdf_path: str, shard_dir: str, dedup: bool = True) -> Dict[str, Any]:
+    """Worker: parse, split and embed one PDF into a shard directory.
+
+    Nothing is written to the vectorstore; the parent merges shards with a
+    single writer (faiss_store.merge_shards). dedup merges near-duplicate
+    chunks of this PDF before embedding; merge_shards handles copies across PDFs.
+    """
+    from app.backend.retriever.pdf.loader import load_pdf
+    from app.backend.retriever.pdf.splitter import split_into_chunks, get_embedder
+    from app.backend.retriever.pdf.batching import BucketedEmbeddings
+    from app.backend.vector_store.embedding_cache import CachedEmbeddings
+    from app.backend.vector_store.dedup import deduplicate_chunks
+
+    start = time.perf_counter()
+    chunks = split_into_chunks(load_pdf(pdf_path))
+    if not chunks:
+        raise ValueError(f"No chunks extracted from {Path(pdf_path).name}")
+    if dedup:
+        chunks = deduplicate_chunks(chunks)
+    embedder = get_embedder()
+    model_name = getattr(embedder, "model_name", type(embedder).__name__)
+    vectors = CachedEmbeddings(BucketedEmbeddings(embedder)).embed_documents(
+        [chunk.page_content for chunk in chunks]
+    )
+
+    shard = Path(shard_dir)
+    shard.mkdir(parents=True, exist_ok=True)
+    np.save(shard / "embeddings.npy", np.array(vectors, dtype='float32'))
+    with open(shard / "chunks.pkl", "wb") as f:
+        pickle.dump(chunks, f)
+    (shard / "shard.json").write_text(json.dumps({"pdf": pdf_path, "embedder": model_name}))
+    return {"pdf": Path(pdf_path).name, "chunks": len(chunks), "seconds": time.perf_counter() - start}
+
+
+def ingest_parallel(
+    pdf_files: List[Path],
+    domain: str,
+    workers: Optional[int] = None,
+    threads_per_worker: int = 1,
+    metric: Optional[str] = None
+) -> Dict[str, Any]:
+    """Ingest PDFs with a process pool; returns per-file results and totals.
+
+    Workers parse, split and embed one PDF each into a shard under
+    <vectorstore>/shards/<run>; the parent process then merges all successful
+    shards into the vectorstore in one publish. Failed PDFs are reported and
+    left out. workers x threads_per_worker should not exceed the CPU count.
+    Each worker loads its own embedding model unless EMBEDDING_BACKEND=service.
+    """
+    from app.backend.vector_store.faiss_store import get_vectorstore_path, merge_shards
+
+    workers = workers or default_workers()
+    run_dir = get_vectorstore_path(domain) / SHARDS_DIR / uuid.uuid4().hex[:8]
+    print(f"🐞 [Ingest] {len(pdf_files)} PDFs, {workers} workers x {threads_per_worker} threads")
+
+    start = time.perf_counter()
+    results, failed, shard_dirs = [], [], []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(domain, threads_per_worker)) as executor:
+            futures = {
+                executor.submit(embed_shard, str(pdf), str(run_dir / f"{i:05d}")): (pdf, run_dir / f"{i:05d}")
+                for i, pdf in enumerate(pdf_files)
+            }
+            for future in as_completed(futures):
+                pdf, shard_dir = futures[future]
+                try:
+                    results.append(future.result())
+                    shard_dirs.append(shard_dir)
+                    print(f"✓ {pdf.name} ({results[-1]['chunks']} chunks, {results[-1]['seconds']:.1f}s)")
+                except Exception as e:
+                    failed.append({"pdf": pdf.name, "error": str(e)})
+                    print(f"✗ {pdf.name}: {e}")
+
+        # Shards in input order, so chunk order does not depend on worker timing
+        chunk_ids = merge_shards(sorted(shard_dirs), domain, metric=metric) if shard_dirs else {}
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    elapsed = time.perf_counter() - start
+    chunks = sum(r["chunks"] for r in results)
+    written = sum(len(ids) for ids in chunk_ids.values())
+    print(f"✅ [Ingest] {len(results)}/{len(pdf_files)} PDFs, {chunks} chunks in {elapsed:.1f}s "
+          f"({chunks / elapsed if elapsed else 0:.0f} chunks/s), {written} written")
+    return {"processed": results, "failed": failed, "chunks": chunks, "written": written,
+            "chunk_ids": chunk_ids, "seconds": elapsed}
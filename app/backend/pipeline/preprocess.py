@@ -1,7 +1,7 @@
 import sys
 from pathlib import Path
 import traceback
-from typing import List
+from typing import List, Optional
 import argparse
 from langchain_core.documents import Document
 import os
@@ -28,9 +28,7 @@ print(f"Python path: {sys.path}")
 
 try:
     # Now import backend modules using absolute path
-    from app.backend.retriever.pdf.loader import load_pdf
-    from app.backend.retriever.pdf.splitter import split_into_chunks, get_embedder
-    from app.backend.vector_store.faiss_store import build_faiss_index
+    from app.backend.pipeline.streaming_ingest import ingest_stream
     from app.backend.domains.manager import DomainManager
     print("All imports successful!")
 except ImportError as e:
@@ -41,7 +39,7 @@ except ImportError as e:
     raise
 
 
-def process_pdf(file_path: str, domain: str) -> Path:
+def process_pdf(file_path: str, domain: str, metric: Optional[str] = None) -> Path:
     """Process a single PDF file into the specified domain's vectorstore"""
     print(f"\n=== DEBUG: Starting PDF Processing ===")
     print(f"Input file: {file_path}")
@@ -60,25 +58,20 @@ def process_pdf(file_path: str, domain: str) -> Path:
         output_dir.mkdir(parents=True, exist_ok=True)
         print(f"Created output directory: {output_dir.exists()}")
         
-        print("Loading PDF...")
-        docs = load_pdf(file_path)
-        print(f"Loaded {len(docs)} pages")
-        
-        print("Splitting into chunks...")
-        chunks = split_into_chunks(docs)
-        print(f"Created {len(chunks)} chunks")
-        
-        print("Building FAISS index...")
-        embedder = get_embedder()
-        print(f"Using embedder: {embedder.model_name}")
-        
-        build_faiss_index(chunks, embedder, domain_name=current_config.domain)
-        print("FAISS index built successfully")
+        # Pages are parsed, split, embedded and written as a stream, so memory stays
+        # bounded however large the PDF is
+        print("Streaming PDF into the vectorstore...")
+        result = ingest_stream([Path(file_path)], current_config.domain, metric=metric)
+        if result["failed"]:
+            raise RuntimeError(result["failed"][0]["error"])
+        if not result["chunks"]:
+            raise ValueError(f"No readable content in PDF: {file_path}")
+        print(f"FAISS index built successfully ({result['chunks']} chunks)")
         
         # Verify files were created
         print("\n=== Verifying Output Files ===")
-        print(f"index.faiss exists: {(output_dir / 'index.faiss').exists()}")
-        print(f"index.pkl exists: {(output_dir / 'index.pkl').exists()}")
+        print(f"segments.json exists: {(output_dir / 'segments.json').exists()}")
+        print(f"Segment files: {len(list((output_dir / 'segments').glob('*.faiss')))}")
         
         return output_dir
     except Exception as e:
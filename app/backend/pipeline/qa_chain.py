@@ -2,9 +2,21 @@ from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 from app.backend.config.config import current_config
+from app.backend.retriever.reranker import DEFAULT_RERANK_CANDIDATES, DEFAULT_RERANK_TOP_N
 
-def build_qa_chain(llm, retriever, company_name=None):
-    """Build QA chain with proper input handling"""
+def build_qa_chain(
+    llm,
+    retriever,
+    company_name=None,
+    reranker=None,
+    rerank_candidates=DEFAULT_RERANK_CANDIDATES,
+    rerank_top_n=DEFAULT_RERANK_TOP_N
+):
+    """Build QA chain with proper input handling.
+
+    With a reranker, the retriever over-fetches rerank_candidates chunks and only
+    the rerank_top_n best by cross-encoder score are put into the prompt.
+    """
     if company_name is None:
         try:
             module = __import__(
@@ -44,7 +56,11 @@ def build_qa_chain(llm, retriever, company_name=None):
         }
         
         # Get documents from retriever
-        docs = retriever.get_relevant_documents(prepared_inputs["question"])
+        if reranker is None:
+            docs = retriever.get_relevant_documents(prepared_inputs["question"])
+        else:
+            candidates = retriever.invoke(prepared_inputs["question"], k=rerank_candidates)
+            docs = reranker.rerank(prepared_inputs["question"], candidates, top_n=rerank_top_n)
         context = "\n\n".join(doc.page_content for doc in docs)
         
         # Combine all inputs for the LLM
@@ -0,0 +1,262 @@
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+EMBED_BATCH_CHUNKS = 64        # chunks per embedding call
+QUEUE_DEPTH = 4                # batches buffered between stages
+FLUSH_ROWS = 2048              # chunks of one document held before a segment is written
+
+_DONE = object()
+
+
+class _StageError:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class _Citations:
+    """Duplicates dropped before embedding, as (position of the kept chunk in its document, citation) pairs"""
+    def __init__(self, pairs: List[Any]):
+        self.pairs = pairs
+
+
+class _PdfFailed:
+    def __init__(self, pdf: Path, error: Exception):
+        self.pdf = pdf
+        self.error = error
+
+
+def _put(q: "queue.Queue", item: Any, stop: threading.Event) -> bool:
+    """Blocking put that gives up once the pipeline is stopping"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _read_stage(
+    pdf_files: List[Path],
+    out: "queue.Queue",
+    stop: threading.Event,
+    batch_chunks: int,
+    dedup: bool
+) -> None:
+    """Parse and split PDFs page by page into batches of chunks.
+
+    With dedup, near-duplicates of earlier chunks of the same PDF are dropped
+    here, before they are embedded; their citations follow as _Citations.
+    """
+    from app.backend.retriever.pdf.loader import iter_pdf_pages
+    from app.backend.retriever.pdf.splitter import iter_chunks
+    from app.backend.vector_store.dedup import StreamingDeduplicator
+
+    deduplicator = StreamingDeduplicator() if dedup else None
+
+    def emit(batch: List[Any]) -> bool:
+        if deduplicator is None:
+            return _put(out, batch, stop)
+        kept, duplicates = deduplicator.filter(batch)
+        # The kept copies are queued first, so the writer already holds them
+        return ((not kept or _put(out, kept, stop))
+                and (not duplicates or _put(out, _Citations(duplicates), stop)))
+
+    try:
+        for pdf in pdf_files:
+            batch = []
+            if deduplicator is not None:
+                deduplicator.reset()
+            try:
+                for chunk in iter_chunks(iter_pdf_pages(str(pdf))):
+                    batch.append(chunk)
+                    if len(batch) >= batch_chunks:
+                        if not emit(batch):
+                            return
+                        batch = []
+            except Exception as e:
+                if not _put(out, _PdfFailed(pdf, e), stop):
+                    return
+                continue
+            if batch and not emit(batch):
+                return
+            if deduplicator is not None and deduplicator.seen > deduplicator.kept:
+                print(f"🐞 [dedup] {pdf.name}: {deduplicator.seen} chunks -> {deduplicator.kept} "
+                      f"({deduplicator.seen - deduplicator.kept} near-duplicates not embedded)")
+        _put(out, _DONE, stop)
+    except Exception as e:
+        _put(out, _StageError(e), stop)
+
+
+def _embed_stage(embedder: Any, inq: "queue.Queue", out: "queue.Queue", stop: threading.Event) -> None:
+    """Embed each chunk batch; failure markers and the end marker pass through"""
+    try:
+        while not stop.is_set():
+            try:
+                batch = inq.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if not isinstance(batch, list):
+                if not _put(out, batch, stop) or batch is _DONE or isinstance(batch, _StageError):
+                    return
+                continue
+            vectors = np.array(embedder.embed_documents([chunk.page_content for chunk in batch]), dtype='float32')
+            if not _put(out, (batch, vectors), stop):
+                return
+    except Exception as e:
+        _put(out, _StageError(e), stop)
+
+
+def ingest_stream(
+    pdf_files: List[Path],
+    domain: str,
+    embedder: Any = None,
+    metric: Optional[str] = None,
+    compact: bool = True,
+    dedup: bool = True,
+    batch_chunks: int = EMBED_BATCH_CHUNKS,
+    queue_depth: int = QUEUE_DEPTH,
+    flush_rows: int = FLUSH_ROWS
+) -> Dict[str, Any]:
+    """Ingest PDFs through a bounded page -> chunk -> embedding -> segment pipeline.
+
+    Parsing, embedding and segment writing (the calling thread) run concurrently,
+    joined by bounded queues, so memory is bounded by queue_depth batches plus
+    flush_rows buffered chunks, whatever the size of a PDF or of the library.
+    Each document is written under a staging key, as several segments when it
+    is larger than flush_rows (upsert, then append), and replaces its previous
+    version only once all of it is written; everything becomes visible in one
+    publish at the end. A PDF that fails mid-way has its staged parts dropped
+    and keeps its previous version, as does every staged document when the
+    pipeline itself fails. dedup drops near-duplicates of earlier chunks of the
+    same PDF in the read stage, before they are embedded; the kept copy cites
+    the dropped one while it is still buffered, i.e. always for PDFs of up to
+    flush_rows chunks.
+    """
+    from app.backend.retriever.pdf.splitter import get_embedder
+    from app.backend.retriever.pdf.batching import BucketedEmbeddings
+    from app.backend.vector_store.embedding_cache import CachedEmbeddings
+    from app.backend.vector_store.dedup import _citation
+    from app.backend.vector_store.faiss_store import get_vectorstore_path, _migrate_legacy_index
+    from app.backend.vector_store.segment_store import SegmentStore, document_key, staging_key
+
+    embedder = embedder or get_embedder()
+    model_name = getattr(embedder, "model_name", type(embedder).__name__)
+    persist_path = get_vectorstore_path(domain)
+    persist_path.mkdir(parents=True, exist_ok=True)
+    store = SegmentStore(persist_path, metric=metric)
+    _migrate_legacy_index(store, persist_path)
+    store.discard_staged()
+
+    chunk_queue: "queue.Queue" = queue.Queue(maxsize=queue_depth)
+    vector_queue: "queue.Queue" = queue.Queue(maxsize=queue_depth)
+    stop = threading.Event()
+    stages = [
+        threading.Thread(target=_read_stage, args=(pdf_files, chunk_queue, stop, batch_chunks, dedup),
+                         name="ingest-read", daemon=True),
+        threading.Thread(target=_embed_stage,
+                         args=(CachedEmbeddings(BucketedEmbeddings(embedder)), chunk_queue, vector_queue, stop),
+                         name="ingest-embed", daemon=True),
+    ]
+    print(f"🐞 [Stream] Ingesting {len(pdf_files)} PDFs (batch {batch_chunks}, "
+          f"queue {queue_depth}, flush {flush_rows})")
+
+    start = time.perf_counter()
+    chunk_ids: Dict[str, List[int]] = {}
+    staged: Dict[str, List[int]] = {}
+    failed: List[Dict[str, str]] = []
+    buffer: List[Any] = []
+    buffer_vectors: List[np.ndarray] = []
+    buffer_start = 0               # position of buffer[0] among its document's chunks
+    buffer_key: Optional[str] = None
+    chunks = 0
+    duplicates = 0
+
+    def flush() -> None:
+        nonlocal buffer, buffer_vectors, buffer_start
+        if not buffer:
+            return
+        documents, vectors = buffer, np.concatenate(buffer_vectors)
+        if buffer_key in staged:
+            store.append(staging_key(buffer_key), documents, vectors)
+        else:
+            store.upsert(staging_key(buffer_key), documents, vectors)
+            staged[buffer_key] = []
+        staged[buffer_key].extend(doc.metadata.get("chunk_id") for doc in documents)
+        buffer_start += len(buffer)
+        buffer, buffer_vectors = [], []
+
+    def finish(key: str) -> None:
+        """Write the document's last part and swap it in for the old version"""
+        flush()
+        if key in staged:
+            store.commit_staged(key)
+            chunk_ids[key] = staged.pop(key)
+
+    for stage in stages:
+        stage.start()
+    try:
+        while True:
+            item = vector_queue.get()
+            if item is _DONE:
+                if buffer_key is not None:
+                    finish(buffer_key)
+                break
+            if isinstance(item, _StageError):
+                raise item.error
+            if isinstance(item, _Citations):
+                duplicates += len(item.pairs)
+                for position, citation in item.pairs:
+                    # A kept copy already written as a segment part can no longer be cited on
+                    if position >= buffer_start:
+                        kept = buffer[position - buffer_start]
+                        citations = kept.metadata.setdefault("citations", [_citation(kept)])
+                        if citation not in citations:
+                            citations.append(citation)
+                continue
+            if isinstance(item, _PdfFailed):
+                key = f"{item.pdf.stem}.pdf"
+                print(f"⚠️ [Stream] Failed to process {item.pdf.name}, keeping its previous version: {item.error}")
+                failed.append({"pdf": item.pdf.name, "error": str(item.error)})
+                if buffer_key == key:
+                    buffer, buffer_vectors = [], []
+                if key in staged:
+                    store.delete(staging_key(key))
+                    del staged[key]
+                continue
+            batch, vectors = item
+            # Rows are appended in stream order; a new document finishes the previous one
+            for row, chunk in enumerate(batch):
+                key = document_key(chunk)
+                if key != buffer_key:
+                    if buffer_key is not None:
+                        finish(buffer_key)
+                    buffer_key, buffer_start = key, 0
+                elif len(buffer) >= flush_rows:
+                    flush()
+                buffer.append(chunk)
+                buffer_vectors.append(vectors[row:row + 1])
+            chunks += len(batch)
+    except Exception:
+        # Documents already committed are complete; partial ones are dropped
+        store.discard_staged()
+        raise
+    finally:
+        stop.set()
+        for stage in stages:
+            stage.join(timeout=5)
+
+    if chunk_ids:
+        store.publish(embedder=model_name)
+        if compact:
+            store.compact_in_background()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ [Stream] {len(pdf_files) - len(failed)}/{len(pdf_files)} PDFs, {chunks} chunks in {elapsed:.1f}s "
+          f"({chunks / elapsed if elapsed else 0:.0f} chunks/s)")
+    return {"pdfs": len(pdf_files), "chunks": chunks, "duplicates": duplicates,
+            "chunk_ids": chunk_ids, "failed": failed, "seconds": elapsed}
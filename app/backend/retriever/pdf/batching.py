@@ -0,0 +1,101 @@
+import time
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+DEFAULT_TOKEN_BUDGET = 8192     # padded tokens per batch (e.g. 32 x 256, or 128 x 64)
+DEFAULT_MAX_BATCH = 32
+MAX_SEQUENCE_TOKENS = 512
+
+
+def _tokenizer_of(embedder: Any) -> Any:
+    """Hugging Face tokenizer behind an embedder, if it exposes one"""
+    tokenizer = getattr(embedder, "tokenizer", None)
+    if tokenizer is None:
+        client = getattr(embedder, "_client", None) or getattr(embedder, "client", None)
+        tokenizer = getattr(client, "tokenizer", None)
+    return tokenizer
+
+
+def token_lengths(texts: List[str], tokenizer: Any = None) -> np.ndarray:
+    """Tokens per text including special tokens; ~4 characters per token without a tokenizer"""
+    if tokenizer is None:
+        return np.array([min(len(text) // 4 + 2, MAX_SEQUENCE_TOKENS) for text in texts], dtype='int64')
+    encoded = tokenizer(texts, add_special_tokens=True, truncation=True, max_length=MAX_SEQUENCE_TOKENS)
+    return np.array([len(ids) for ids in encoded["input_ids"]], dtype='int64')
+
+
+def plan_batches(lengths: np.ndarray, token_budget: int, max_batch: int) -> List[np.ndarray]:
+    """Group text positions, shortest first, into batches whose padded size fits the budget"""
+    order = np.argsort(lengths, kind='stable')
+    batches, current = [], []
+    for position in order:
+        # Sorted ascending, so the newest member is the longest and sets the padding
+        if current and ((len(current) + 1) * lengths[position] > token_budget or len(current) >= max_batch):
+            batches.append(np.array(current, dtype='int64'))
+            current = []
+        current.append(position)
+    if current:
+        batches.append(np.array(current, dtype='int64'))
+    return batches
+
+
+def padding_waste(lengths: np.ndarray, batches: List[np.ndarray]) -> float:
+    """Fraction of padded token slots that hold padding"""
+    padded = sum(len(batch) * int(lengths[batch].max()) for batch in batches)
+    return 1.0 - int(lengths.sum()) / padded if padded else 0.0
+
+
+class BucketedEmbeddings:
+    """Embeddings front-end that batches texts of similar token length.
+
+    Texts are sorted by length, cut into batches under a padded-token budget,
+    embedded batch by batch and scattered back to their input order, so the
+    output is the same list embed_documents would return. sentence-transformers
+    already sorts by length within one encode call; the gain is for embedders
+    that batch in input order (OnnxEmbeddings, also behind the embedding
+    service), plus a bound on the padded tokens of any single batch.
+    last_report holds the measured padding and rate of the last call.
+    max_batch defaults to the wrapped embedder's own batch size.
+    """
+
+    def __init__(self, embedder: Any, token_budget: int = DEFAULT_TOKEN_BUDGET, max_batch: Optional[int] = None):
+        self.embedder = embedder
+        self.token_budget = token_budget
+        self.max_batch = max_batch or (getattr(embedder, "encode_kwargs", None) or {}).get(
+            "batch_size", getattr(embedder, "batch_size", DEFAULT_MAX_BATCH))
+        self.tokenizer = _tokenizer_of(embedder)
+        # Passed through so cache fingerprints and manifests see the wrapped model
+        self.model_name = getattr(embedder, "model_name", type(embedder).__name__)
+        self.encode_kwargs = getattr(embedder, "encode_kwargs", None) or {}
+        self.last_report: Dict[str, Any] = {}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        start = time.perf_counter()
+        lengths = token_lengths(texts, self.tokenizer)
+        batches = plan_batches(lengths, self.token_budget, self.max_batch)
+        vectors: List[Any] = [None] * len(texts)
+        for batch in batches:
+            embedded = self.embedder.embed_documents([texts[i] for i in batch])
+            for position, vector in zip(batch, embedded):
+                vectors[position] = vector
+        elapsed = time.perf_counter() - start
+
+        self.last_report = {
+            "texts": len(texts),
+            "batches": len(batches),
+            "tokens": int(lengths.sum()),
+            "padding_waste": padding_waste(lengths, batches),
+            "seconds": elapsed,
+            "chunks_per_second": len(texts) / elapsed if elapsed else 0.0,
+            "tokens_per_second": int(lengths.sum()) / elapsed if elapsed else 0.0,
+        }
+        report = self.last_report
+        print(f"🐞 [Batching] {report['texts']} chunks in {report['batches']} batches, "
+              f"padding {report['padding_waste']:.0%}, "
+              f"{report['chunks_per_second']:.0f} chunks/s")
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embedder.embed_query(text)
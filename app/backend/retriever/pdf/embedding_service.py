@@ -0,0 +1,186 @@
+import json
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional
+
+DEFAULT_SERVICE_URL = "http://127.0.0.1:8765"
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+
+
+def get_service_url() -> str:
+    """Sidecar address; EMBEDDING_SERVICE_URL overrides the localhost default"""
+    return os.getenv("EMBEDDING_SERVICE_URL", DEFAULT_SERVICE_URL).rstrip("/")
+
+
+def _query_batch_fn(embedder: Any):
+    """Batch function whose vectors match embedder.embed_query text for text.
+
+    Symmetric models (no query instruction or query-only encode kwargs, e.g.
+    the default bge setup) embed queries exactly like documents, so the batch
+    goes through embed_documents. Asymmetric ones fall back to embed_query
+    per text: correct, but without the batching speed-up.
+    """
+    if hasattr(embedder, "embed_queries"):
+        return embedder.embed_queries
+    if getattr(embedder, "query_instruction", None) or getattr(embedder, "query_encode_kwargs", None):
+        return lambda texts: [embedder.embed_query(text) for text in texts]
+    return embedder.embed_documents
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-text embedding requests into one forward pass.
+
+    The worker takes the first waiting request, then collects more for up to
+    max_wait_ms or until max_batch texts are queued, and embeds them together
+    with the query-side batch function, so served query vectors equal the
+    in-process embed_query ones.
+    """
+
+    def __init__(self, embedder: Any, max_batch: int = DEFAULT_MAX_BATCH, max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.embed_batch = _query_batch_fn(embedder)
+        self.batches = 0
+        self.requests = 0
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _run(self) -> None:
+        while True:
+            pending = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                vectors = self.embed_batch([text for text, _ in pending])
+                for (_, future), vector in zip(pending, vectors):
+                    future.set_result(vector)
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+            self.batches += 1
+            self.requests += len(pending)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch": self.requests / self.batches if self.batches else 0.0,
+        }
+
+
+def _handler(embedder: Any, batcher: MicroBatcher):
+    class EmbeddingHandler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self._reply(404, {"error": "not found"})
+            self._reply(200, {
+                "model_name": getattr(embedder, "model_name", type(embedder).__name__),
+                "encode_kwargs": getattr(embedder, "encode_kwargs", None) or {},
+                "batching": batcher.stats(),
+            })
+
+        def do_POST(self):
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                if self.path == "/embed_query":
+                    vectors = [batcher.submit(request["text"]).result()]
+                elif self.path == "/embed_documents":
+                    # Ingestion batches are already large; they go straight to the model
+                    vectors = embedder.embed_documents(request["texts"])
+                else:
+                    return self._reply(404, {"error": "not found"})
+                self._reply(200, {"vectors": [list(map(float, v)) for v in vectors]})
+            except Exception as e:
+                self._reply(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return EmbeddingHandler
+
+
+def serve(
+    embedder: Any,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    max_batch: int = DEFAULT_MAX_BATCH,
+    max_wait_ms: float = DEFAULT_MAX_WAIT_MS
+) -> ThreadingHTTPServer:
+    """Start the embedding sidecar in a background thread and return the server"""
+    batcher = MicroBatcher(embedder, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    if batcher.embed_batch not in (embedder.embed_documents, getattr(embedder, "embed_queries", None)):
+        print("⚠️ [EmbeddingService] Model embeds queries differently from documents; query requests are not batched")
+    server = ThreadingHTTPServer((host, port), _handler(embedder, batcher))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="embedding-service", daemon=True).start()
+    print(f"✅ [EmbeddingService] Serving {getattr(embedder, 'model_name', '?')} on http://{host}:{server.server_port}")
+    return server
+
+
+class EmbeddingClient:
+    """Embeddings-compatible client of the sidecar.
+
+    model_name and encode_kwargs mirror the served model, so embedding-cache
+    fingerprints and manifests are identical to using the model in-process.
+    """
+
+    def __init__(self, url: Optional[str] = None, timeout: float = 60.0):
+        self.url = (url or get_service_url()).rstrip("/")
+        self.timeout = timeout
+        info = self.health()
+        self.model_name = info["model_name"]
+        self.encode_kwargs = info["encode_kwargs"]
+
+    def _request(self, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(
+            f"{self.url}{path}", data=data, headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"Embedding service error: {json.loads(e.read()).get('error')}") from e
+        except urllib.error.URLError as e:
+            raise ConnectionError(f"Embedding service not reachable at {self.url} "
+                                  f"(start it with `cli embed-server`)") from e
+
+    def health(self) -> Dict[str, Any]:
+        return self._request("/health")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._request("/embed_documents", {"texts": texts})["vectors"]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._request("/embed_query", {"text": text})["vectors"][0]
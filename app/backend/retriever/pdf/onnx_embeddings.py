@@ -0,0 +1,145 @@
+import os
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+ONNX_MODELS_DIR = Path("app") / "data" / "models"
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+
+# Order of BERT's forward() arguments; exported graph inputs follow it
+_MODEL_INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+
+
+def onnx_model_dir(model_name: str) -> Path:
+    """Local export directory of a Hugging Face model, e.g. app/data/models/BAAI--bge-small-en-v1.5-onnx"""
+    return ONNX_MODELS_DIR / f"{model_name.replace('/', '--')}-onnx"
+
+
+def onnx_model_name(model_name: str, quantized: bool = True) -> str:
+    """Name ONNX vectors are recorded under; distinct so caches and manifests never mix backends"""
+    return f"{model_name}-onnx{'-int8' if quantized else ''}"
+
+
+def export_onnx(model_name: str, output_dir: Optional[Path] = None, quantize: bool = True) -> Path:
+    """Export a transformer encoder to ONNX and optionally dynamic-quantize its weights to int8.
+
+    Writes model.onnx (and model.int8.onnx) plus the tokenizer files; returns the directory.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    output_dir = Path(output_dir or onnx_model_dir(model_name))
+    output_dir.mkdir(parents=True, exist_ok=True)
+    print(f"🐞 [ONNX] Exporting {model_name} to {output_dir}")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+    sample = tokenizer(["export sample text"], return_tensors="pt")
+    input_names = [name for name in _MODEL_INPUTS if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            ({name: sample[name] for name in input_names},),
+            str(output_dir / FP32_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17
+        )
+    tokenizer.save_pretrained(output_dir)
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(str(output_dir / FP32_FILE), str(output_dir / INT8_FILE), weight_type=QuantType.QInt8)
+        print(f"✅ [ONNX] int8 model: {(output_dir / INT8_FILE).stat().st_size / 1e6:.0f} MB "
+              f"(fp32: {(output_dir / FP32_FILE).stat().st_size / 1e6:.0f} MB)")
+    return output_dir
+
+
+class OnnxEmbeddings:
+    """LangChain-compatible embeddings running an exported encoder on ONNX Runtime.
+
+    Pooling and normalization match the sentence-transformers configuration of
+    bge models (CLS token, L2-normalized), so vectors are interchangeable with
+    HuggingFaceEmbeddings up to quantization error.
+
+    Experimental and never selected by default: the int8-vs-PyTorch agreement
+    check (tests/pdf/verify_onnx_embedder.py) has not been run yet.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        model_dir: Optional[Path] = None,
+        quantized: bool = True,
+        batch_size: int = 32,
+        max_length: int = 512,
+        pooling: str = "cls",
+        normalize: bool = True,
+        threads: Optional[int] = None
+    ):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = Path(model_dir or onnx_model_dir(model_name))
+        model_file = model_dir / (INT8_FILE if quantized else FP32_FILE)
+        if not model_file.exists():
+            export_onnx(model_name, model_dir, quantize=quantized)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = threads or int(os.getenv("ONNX_THREADS", "0"))
+        self.model_path = model_file
+        self.session = ort.InferenceSession(str(model_file), options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model_name = onnx_model_name(model_name, quantized)
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.pooling = pooling
+        self.normalize = normalize
+        self.encode_kwargs: Dict[str, Any] = {"normalize_embeddings": normalize, "pooling": pooling}
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+        )
+        feed = {name: encoded[name].astype('int64') for name in self.input_names}
+        hidden = self.session.run(None, feed)[0]
+        if self.pooling == "cls":
+            vectors = hidden[:, 0]
+        else:
+            mask = encoded["attention_mask"][:, :, None].astype('float32')
+            vectors = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.normalize:
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors.astype('float32')
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        blocks = [self._encode(texts[start:start + self.batch_size])
+                  for start in range(0, len(texts), self.batch_size)]
+        return np.concatenate(blocks).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
+
+
+def cosine_agreement(reference: Any, candidate: Any, texts: List[str]) -> Dict[str, float]:
+    """Cosine similarity between two embedders' vectors for the same texts"""
+    a = np.array(reference.embed_documents(texts), dtype='float32')
+    b = np.array(candidate.embed_documents(texts), dtype='float32')
+    a /= np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+    b /= np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+    cosines = (a * b).sum(axis=1)
+    return {
+        "texts": len(texts),
+        "mean": float(cosines.mean()),
+        "min": float(cosines.min()),
+        "p05": float(np.percentile(cosines, 5)),
+    }
@@ -1,3 +1,8 @@
+import os
+import threading
+import time
+from typing import List, Dict, Any, Iterable, Iterator
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 try:
     from langchain_huggingface import HuggingFaceEmbeddings  # New recommended import
@@ -10,48 +15,138 @@ except ImportError:
         DeprecationWarning
     )
 
-def split_into_chunks(docs, chunk_size=500, chunk_overlap=100):
-    """Split documents while preserving metadata"""
-    splitter = RecursiveCharacterTextSplitter(
+DEFAULT_EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+EMBEDDING_BACKENDS = ("torch", "onnx", "service")
+
+# Process-wide embedder registry, keyed by (model_name, device, backend)
+_EMBEDDERS: Dict[tuple, Any] = {}
+_EMBEDDER_STATS: Dict[tuple, Dict[str, Any]] = {}
+_EMBEDDERS_LOCK = threading.Lock()
+
+def _make_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         separators=["\n\n", "\n", ". ", " ", ""],
         keep_separator=True,
         add_start_index=True  # Helps track original positions
     )
-    
-    chunks = []
+
+def iter_chunks(docs: Iterable[Document], chunk_size=500, chunk_overlap=100) -> Iterator[Document]:
+    """Lazily split a stream of pages; chunk_id counts across the whole stream"""
+    splitter = _make_splitter(chunk_size, chunk_overlap)
+    chunk_id = 0
     for doc in docs:
         try:
             # Preserve all original metadata
             new_chunks = splitter.split_documents([doc])
-            for chunk in new_chunks:
-                chunk.metadata = doc.metadata.copy()  # Copy all metadata
-                # Add chunk-specific info
-                chunk.metadata.update({
-                    "chunk_id": len(chunks),
-                    "is_chunk": True,
-                    "chunk_size": len(chunk.page_content)  # Add character count
-                })
-            chunks.extend(new_chunks)
         except Exception as e:
             print(f"Error splitting document: {e}")
             continue
-    
+        for chunk in new_chunks:
+            chunk.metadata = doc.metadata.copy()  # Copy all metadata
+            # Add chunk-specific info
+            chunk.metadata.update({
+                "chunk_id": chunk_id,
+                "is_chunk": True,
+                "chunk_size": len(chunk.page_content)  # Add character count
+            })
+            chunk_id += 1
+            yield chunk
+
+def split_into_chunks(docs, chunk_size=500, chunk_overlap=100):
+    """Split documents while preserving metadata"""
+    chunks = list(iter_chunks(docs, chunk_size, chunk_overlap))
     print(f"Split {len(docs)} documents into {len(chunks)} chunks")
     return chunks
 
-def get_embedder():
-    """Returns embedding model with updated import"""
+def _onnx_quantized() -> bool:
+    return os.getenv("ONNX_QUANTIZE", "1") != "0"
+
+def _load_embedder(model_name: str, device: str, backend: str = "torch"):
+    if backend == "service":
+        # Shared warm model in the embedding sidecar (cli embed-server)
+        from app.backend.retriever.pdf.embedding_service import EmbeddingClient
+        client = EmbeddingClient()
+        if client.model_name != model_name:
+            print(f"⚠️ [Embedder] Service at {client.url} serves {client.model_name}, not {model_name}")
+        return client
+    if backend == "onnx":
+        # int8 ONNX Runtime model on CPU; exported on first use. Experimental:
+        # its agreement with the PyTorch vectors has not been verified yet
+        print("⚠️ [Embedder] ONNX backend is experimental; verify it with "
+              "`export-onnx --check` or tests/pdf/verify_onnx_embedder.py before indexing with it")
+        from app.backend.retriever.pdf.onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings(model_name, quantized=_onnx_quantized())
     return HuggingFaceEmbeddings(
-        model_name="BAAI/bge-small-en-v1.5",
-        model_kwargs={"device": "cpu"},
+        model_name=model_name,
+        model_kwargs={"device": device},
         encode_kwargs={
             "normalize_embeddings": True,
             "batch_size": 32  # Added for better performance
         }
     )
 
+def _model_bytes(embedder) -> int:
+    """Parameter and buffer memory of the underlying torch model (0 if unknown)"""
+    model = getattr(embedder, "_client", None) or getattr(embedder, "client", None)
+    model_path = getattr(embedder, "model_path", None)
+    if model_path is not None:
+        # ONNX Runtime: size of the (possibly int8) model file
+        return os.path.getsize(model_path)
+    if model is None or not hasattr(model, "parameters"):
+        return 0
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+def get_embedder(model_name: str = DEFAULT_EMBEDDING_MODEL, device: str = "cpu", backend: str = None):
+    """Returns the process-wide embedding model, loading it on first use.
+
+    Every caller (ingestion, LLM factory, web app) shares one instance per
+    (model_name, device, backend), so the weights are loaded and held in memory once.
+    backend defaults to EMBEDDING_BACKEND: "torch" (default), "onnx" (experimental,
+    opt-in only), or "service" to use the embedding sidecar at EMBEDDING_SERVICE_URL
+    instead of loading the model.
+    """
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "torch")
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {EMBEDDING_BACKENDS}")
+    key = (model_name, device, backend)
+    embedder = _EMBEDDERS.get(key)
+    if embedder is not None:
+        return embedder
+    with _EMBEDDERS_LOCK:
+        if key not in _EMBEDDERS:
+            print(f"🐞 [Embedder] Loading {model_name} on {device} ({backend})...")
+            start = time.perf_counter()
+            embedder = _load_embedder(model_name, device, backend)
+            _EMBEDDER_STATS[key] = {
+                "model_name": model_name,
+                "device": device,
+                "backend": backend,
+                "load_seconds": time.perf_counter() - start,
+                "model_bytes": _model_bytes(embedder),
+            }
+            _EMBEDDERS[key] = embedder
+            print(f"✅ [Embedder] Loaded {model_name} in {_EMBEDDER_STATS[key]['load_seconds']:.1f}s "
+                  f"({_EMBEDDER_STATS[key]['model_bytes'] / 1e6:.0f} MB)")
+        return _EMBEDDERS[key]
+
+def embedder_name(model_name: str = DEFAULT_EMBEDDING_MODEL, backend: str = None) -> str:
+    """model_name get_embedder() would report, without loading the model"""
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "torch")
+    if backend == "onnx":
+        from app.backend.retriever.pdf.onnx_embeddings import onnx_model_name
+        return onnx_model_name(model_name, _onnx_quantized())
+    if backend == "service":
+        from app.backend.retriever.pdf.embedding_service import EmbeddingClient
+        return EmbeddingClient().model_name
+    return model_name
+
+def embedder_stats() -> List[Dict[str, Any]]:
+    """Load time and memory footprint of every embedding model loaded in this process"""
+    return [dict(stats) for stats in _EMBEDDER_STATS.values()]
+
 # Test function for debugging
 def _test_embeddings():
     """Verify the embedder produces numpy arrays"""
@@ -0,0 +1,106 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple
+from langchain_core.documents import Document
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+DEFAULT_RERANK_CANDIDATES = 20
+DEFAULT_RERANK_TOP_N = 3
+DEFAULT_CACHE_SIZE = 10_000
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class CrossEncoderReranker:
+    """Re-score (query, chunk) pairs with a cross-encoder and keep the best few.
+
+    Uncached pairs of a query are scored in one batched forward pass on CPU.
+    Scores are cached per (query hash, chunk hash), so repeated questions and
+    chunks that come back for follow-up questions are not scored again.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_RERANK_MODEL,
+        batch_size: int = 32,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        device: str = "cpu"
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.device = device
+        self.hits = 0
+        self.misses = 0
+        self._model = None
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def model(self) -> Any:
+        """The cross-encoder, loaded on first use"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    print(f"🐞 [Reranker] Loading {self.model_name} on {self.device}")
+                    self._model = CrossEncoder(self.model_name, device=self.device)
+        return self._model
+
+    def score(self, query: str, documents: List[Document]) -> List[float]:
+        """Relevance score of every document for the query (higher is better)"""
+        query_hash = _digest(query)
+        keys = [(query_hash, _digest(doc.page_content)) for doc in documents]
+        scores: Dict[Tuple[str, str], float] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[key] = self._cache[key]
+            self.hits += len(scores)
+
+        pending = {key: doc for key, doc in zip(keys, documents) if key not in scores}
+        if pending:
+            predicted = self.model.predict(
+                [(query, doc.page_content) for doc in pending.values()],
+                batch_size=self.batch_size,
+                show_progress_bar=False
+            )
+            with self._lock:
+                self.misses += len(pending)
+                for key, value in zip(pending, predicted):
+                    scores[key] = self._cache[key] = float(value)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return [scores[key] for key in keys]
+
+    def rerank(
+        self,
+        query: str,
+        documents: List[Document],
+        top_n: int = DEFAULT_RERANK_TOP_N
+    ) -> List[Document]:
+        """The top_n documents by cross-encoder score, best first"""
+        if not documents:
+            return []
+        scores = self.score(query, documents)
+        ranked = sorted(zip(scores, range(len(documents))), key=lambda pair: -pair[0])[:top_n]
+        results = []
+        for score, position in ranked:
+            doc = documents[position]
+            doc.metadata['rerank_score'] = score
+            results.append(doc)
+        print(f"🐞 [Reranker] Kept {len(results)}/{len(documents)} chunks "
+              f"(cache hits={self.hits}, misses={self.misses})")
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "cached_pairs": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,106 @@
+import json
+import random
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+from app.backend.vector_store.segment_store import SegmentStore, hide_staged
+
+CALIBRATION_FILE = "calibration.json"
+
+
+def load_calibration(persist_path: str) -> Optional[Dict[str, Any]]:
+    """Read the stored calibration of a vectorstore, if any"""
+    path = Path(persist_path) / CALIBRATION_FILE
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def score_matrix(queries: np.ndarray, vectors: np.ndarray, metric: str) -> np.ndarray:
+    """Query x corpus score matrix in the same units FAISS reports"""
+    if metric == "ip":
+        return queries @ vectors.T
+    # Squared L2, as returned by IndexFlatL2
+    return (
+        (queries ** 2).sum(axis=1)[:, None]
+        + (vectors ** 2).sum(axis=1)[None, :]
+        - 2 * queries @ vectors.T
+    )
+
+
+def calibrate_threshold(
+    embedder: Any,
+    persist_path: str,
+    queries: Optional[List[str]] = None,
+    k: int = 10,
+    percentile: float = 95.0,
+    noise_sample: int = 2000,
+    bins: int = 40
+) -> Dict[str, Any]:
+    """Build score histograms for sample queries and store a recommended cutoff.
+
+    The cutoff is placed at `percentile` of the background distribution (scores of
+    the queries against random chunks): a hit that is no better than a random chunk
+    is dropped. Without explicit queries, the opening text of sampled chunks is used.
+    Queries and background are drawn from the live chunks of the published snapshot,
+    so deleted or replaced content never shifts the cutoff.
+    """
+    store = SegmentStore(persist_path)
+    if not store.exists():
+        raise FileNotFoundError(f"No segment catalog at {persist_path}")
+    snapshot = store.current_snapshot()
+    catalog = store.read_snapshot(snapshot) if snapshot else hide_staged(store.read_catalog())
+    metric = catalog.get("metric", "l2")
+    blocks = [block for _, _, block in store.iter_live_vectors(catalog)]
+    vectors = np.concatenate(blocks) if blocks else np.empty((0, 0), dtype='float32')
+    if len(vectors) == 0:
+        raise ValueError(f"Vectorstore at {persist_path} has no live chunks")
+
+    if not queries:
+        rows = [(seg["name"], row) for seg in catalog["segments"] for row in store._live_rows(seg)]
+        chunks = {seg["name"]: store._open_chunks(seg["name"]) for seg in catalog["segments"]}
+        queries = [chunks[name][row].page_content[:200]
+                   for name, row in random.sample(rows, min(50, len(rows)))]
+    print(f"🐞 [calibrate] {len(queries)} queries against {len(vectors)} chunks ({metric})")
+
+    query_vectors = np.array([embedder.embed_query(q) for q in queries], dtype='float32')
+    if metric == "ip":
+        query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    scores = score_matrix(query_vectors, vectors, metric)
+
+    # Best hits per query (largest similarity or smallest distance)
+    k = min(k, scores.shape[1])
+    ordered = -scores if metric == "ip" else scores
+    top = np.take_along_axis(scores, np.argsort(ordered, axis=1)[:, :k], axis=1)
+
+    sample = np.random.default_rng(0).choice(
+        scores.shape[1], size=min(noise_sample, scores.shape[1]), replace=False
+    )
+    noise = scores[:, sample].ravel()
+    cutoff = float(np.percentile(noise, percentile if metric == "ip" else 100 - percentile))
+
+    edges = np.histogram_bin_edges(np.concatenate([noise, top.ravel()]), bins=bins)
+    calibration = {
+        "metric": metric,
+        "embedder": getattr(embedder, "model_name", type(embedder).__name__),
+        "cutoff": cutoff,
+        "percentile": percentile,
+        "queries": len(queries),
+        "vectors": int(len(vectors)),
+        "snapshot": snapshot,
+        "segments": [s["name"] for s in catalog["segments"]],
+        "histogram": {
+            "edges": edges.tolist(),
+            "noise": np.histogram(noise, bins=edges)[0].tolist(),
+            "top1": np.histogram(top[:, 0], bins=edges)[0].tolist(),
+            "topk": np.histogram(top.ravel(), bins=edges)[0].tolist(),
+        },
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    with open(Path(persist_path) / CALIBRATION_FILE, "w", encoding="utf-8") as f:
+        json.dump(calibration, f, indent=2)
+    print(f"✅ Recommended {metric} cutoff: {cutoff:.4f}")
+    return calibration
@@ -0,0 +1,176 @@
+import copy
+import json
+from pathlib import Path
+from typing import List, Dict, Any, Tuple, Union
+import numpy as np
+from langchain_core.documents import Document
+
+SCHEMA_FILE = "columns.json"
+TEXT_FILE = "texts.bin"
+OFFSETS_FILE = "offsets.npy"
+MISSING = -1
+
+# Interned vocabularies are decoded at open time, so only low-cardinality keys
+# are interned: at most INTERN_MAX_VALUES distinct values, each repeated on
+# INTERN_MIN_REPEAT rows on average. Other keys (doc_id, citations) are blobs.
+INTERN_MAX_VALUES = 4096
+INTERN_MIN_REPEAT = 4
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+
+
+def write_chunk_store(path: Path, documents: List[Document]) -> None:
+    """Write documents as columns: a UTF-8 text blob with offsets plus one file per metadata key.
+
+    Keys whose values are all integers are stored as int64 columns. Low-cardinality
+    keys are interned: each distinct JSON-encoded value is stored once and rows hold
+    an int32 code (-1 when the key is missing), so a filename repeated on every chunk
+    costs 4 bytes per row. Other keys are stored like the text, as a blob of
+    JSON-encoded values with offsets (empty when the key is missing), decoded per row.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    encoded = [doc.page_content.encode("utf-8") for doc in documents]
+    offsets = np.zeros(len(encoded) + 1, dtype='int64')
+    offsets[1:] = np.cumsum([len(text) for text in encoded])
+    with open(path / TEXT_FILE, "wb") as f:
+        for text in encoded:
+            f.write(text)
+    np.save(path / OFFSETS_FILE, offsets)
+
+    keys = sorted({key for doc in documents for key in doc.metadata})
+    columns: Dict[str, Dict[str, Any]] = {}
+    for key in keys:
+        values = [doc.metadata.get(key) for doc in documents]
+        if all(key in doc.metadata and _is_int(doc.metadata[key]) for doc in documents):
+            np.save(path / f"col.{key}.npy", np.array(values, dtype='int64'))
+            columns[key] = {"kind": "int"}
+            continue
+        tokens = [json.dumps(doc.metadata[key], sort_keys=True, default=str) if key in doc.metadata else None
+                  for doc in documents]
+        distinct = set(tokens) - {None}
+        if len(distinct) <= INTERN_MAX_VALUES and len(distinct) * INTERN_MIN_REPEAT <= len(documents):
+            vocab: Dict[str, int] = {}
+            codes = np.full(len(documents), MISSING, dtype='int32')
+            for row, token in enumerate(tokens):
+                if token is not None:
+                    codes[row] = vocab.setdefault(token, len(vocab))
+            np.save(path / f"col.{key}.npy", codes)
+            columns[key] = {"kind": "interned", "values": list(vocab)}
+            continue
+        blobs = [b"" if token is None else token.encode("utf-8") for token in tokens]
+        value_offsets = np.zeros(len(blobs) + 1, dtype='int64')
+        value_offsets[1:] = np.cumsum([len(blob) for blob in blobs])
+        with open(path / f"col.{key}.bin", "wb") as f:
+            for blob in blobs:
+                f.write(blob)
+        np.save(path / f"col.{key}.npy", value_offsets)
+        columns[key] = {"kind": "blob"}
+
+    with open(path / SCHEMA_FILE, "w", encoding="utf-8") as f:
+        json.dump({"rows": len(documents), "columns": columns}, f)
+
+
+class ChunkStore:
+    """Read-only, memory-mapped columnar chunk storage.
+
+    Only the vocabularies of interned (low-cardinality) keys are decoded at open
+    time, so open cost does not grow with the number of rows; Document objects
+    are built only for the rows that are actually requested.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path / SCHEMA_FILE, "r", encoding="utf-8") as f:
+            schema = json.load(f)
+        self.rows = schema["rows"]
+        self.offsets = np.load(self.path / OFFSETS_FILE, mmap_mode='r')
+        text_path = self.path / TEXT_FILE
+        self.texts = (np.memmap(text_path, dtype='uint8', mode='r')
+                      if text_path.stat().st_size else np.zeros(0, dtype='uint8'))
+        self.columns: Dict[str, np.ndarray] = {}
+        self.vocabs: Dict[str, List[Any]] = {}
+        self.blobs: Dict[str, np.ndarray] = {}
+        for key, spec in schema["columns"].items():
+            self.columns[key] = np.load(self.path / f"col.{key}.npy", mmap_mode='r')
+            if spec["kind"] == "interned":
+                self.vocabs[key] = [json.loads(token) for token in spec["values"]]
+            elif spec["kind"] == "blob":
+                blob_path = self.path / f"col.{key}.bin"
+                self.blobs[key] = (np.memmap(blob_path, dtype='uint8', mode='r')
+                                   if blob_path.stat().st_size else np.zeros(0, dtype='uint8'))
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def text(self, row: int) -> str:
+        start, end = self.offsets[row], self.offsets[row + 1]
+        return bytes(self.texts[start:end]).decode("utf-8")
+
+    def _blob_value(self, key: str, row: int) -> Any:
+        offsets = self.columns[key]
+        start, end = offsets[row], offsets[row + 1]
+        return json.loads(bytes(self.blobs[key][start:end]).decode("utf-8")) if end > start else None
+
+    def value(self, key: str, row: int) -> Any:
+        """Metadata value of one row, or None when the key is missing"""
+        if key in self.blobs:
+            return self._blob_value(key, row)
+        raw = self.columns[key][row]
+        if key not in self.vocabs:
+            return int(raw)
+        return None if raw == MISSING else self.vocabs[key][raw]
+
+    def codes(self, key: str) -> Tuple[np.ndarray, List[Any]]:
+        """Integer code per row (-1 when missing) and the value of each code.
+
+        Blob columns are decoded in full here, so this is meant for building
+        indexes over a column once (e.g. filter postings), not per query.
+        """
+        if key not in self.columns:
+            return np.full(self.rows, MISSING, dtype='int64'), []
+        column = np.asarray(self.columns[key])
+        if key in self.vocabs:
+            return column, self.vocabs[key]
+        if key not in self.blobs:
+            values, codes = np.unique(column, return_inverse=True)
+            return codes, values.tolist()
+        vocab: Dict[Any, int] = {}
+        codes = np.full(self.rows, MISSING, dtype='int64')
+        for row in range(self.rows):
+            value = self._blob_value(key, row)
+            if value is not None:
+                codes[row] = vocab.setdefault(json.dumps(value, sort_keys=True), len(vocab))
+        return codes, [json.loads(token) for token in vocab]
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        meta = {}
+        for key, column in self.columns.items():
+            if key in self.blobs:
+                if column[row + 1] > column[row]:
+                    meta[key] = self._blob_value(key, row)
+            elif key in self.vocabs:
+                code = column[row]
+                if code != MISSING:
+                    value = self.vocabs[key][code]
+                    # Copy containers so callers can never mutate the shared vocabulary
+                    meta[key] = copy.deepcopy(value) if isinstance(value, (list, dict)) else value
+            else:
+                meta[key] = int(column[row])
+        return meta
+
+    def __getitem__(self, row: Union[int, slice]) -> Union[Document, List[Document]]:
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(self.rows))]
+        if row < 0:
+            row += self.rows
+        if not 0 <= row < self.rows:
+            raise IndexError(row)
+        return Document(page_content=self.text(row), metadata=self.metadata(row))
+
+    def __iter__(self):
+        for row in range(self.rows):
+            yield self[row]
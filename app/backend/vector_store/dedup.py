@@ -0,0 +1,152 @@
+import re
+import zlib
+from typing import List, Dict, Any, Tuple
+import numpy as np
+from langchain_core.documents import Document
+
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16                 # 16 bands x 4 rows: pairs above ~0.5 Jaccard share a bucket
+SHINGLE_WORDS = 3
+DEFAULT_SIMILARITY = 0.8       # estimated Jaccard at which two chunks count as duplicates
+
+_PRIME = (1 << 31) - 1
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def _shingles(text: str) -> np.ndarray:
+    """Hashed word n-grams of a chunk, as 31-bit integers"""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    return np.unique(np.array([zlib.crc32(g.encode("utf-8")) & _PRIME for g in grams], dtype='uint64'))
+
+
+def minhash_signatures(texts: List[str], num_permutations: int = NUM_PERMUTATIONS) -> np.ndarray:
+    """(len(texts), num_permutations) MinHash signatures from universal hashes (a*x + b) mod p"""
+    rng = np.random.default_rng(1)
+    a = rng.integers(1, _PRIME, size=num_permutations, dtype='uint64')
+    b = rng.integers(0, _PRIME, size=num_permutations, dtype='uint64')
+    signatures = np.empty((len(texts), num_permutations), dtype='uint64')
+    for row, text in enumerate(texts):
+        shingles = _shingles(text)
+        signatures[row] = ((shingles[:, None] * a[None, :] + b[None, :]) % _PRIME).min(axis=0)
+    return signatures
+
+
+def _citation(doc: Document) -> Dict[str, Any]:
+    return {"filename": doc.metadata.get("filename"), "page_number": doc.metadata.get("page_number")}
+
+
+def deduplicate_chunks(
+    documents: List[Document],
+    similarity: float = DEFAULT_SIMILARITY,
+    bands: int = LSH_BANDS
+) -> List[Document]:
+    """Drop near-duplicate chunks, keeping the first copy of each.
+
+    Candidates come from LSH buckets over MinHash signatures and are confirmed by
+    the fraction of matching signature entries (an estimate of word-shingle
+    Jaccard similarity). The kept chunk gets metadata['citations'], a list of
+    {filename, page_number} for every copy, so answers can cite all sources.
+    """
+    if len(documents) < 2:
+        return documents
+    signatures = minhash_signatures([doc.page_content for doc in documents])
+    rows_per_band = signatures.shape[1] // bands
+
+    # Union-find over confirmed duplicate pairs
+    parent = list(range(len(documents)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(bands):
+        block = signatures[:, band * rows_per_band:(band + 1) * rows_per_band]
+        buckets: Dict[bytes, List[int]] = {}
+        for row in range(len(documents)):
+            buckets.setdefault(block[row].tobytes(), []).append(row)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            first = members[0]
+            agreement = (signatures[members[1:]] == signatures[first]).mean(axis=1)
+            for other, score in zip(members[1:], agreement):
+                if score >= similarity:
+                    # Lower index wins so the canonical chunk is the first occurrence
+                    ra, rb = find(first), find(other)
+                    if ra != rb:
+                        parent[max(ra, rb)] = min(ra, rb)
+
+    clusters: Dict[int, List[int]] = {}
+    for row in range(len(documents)):
+        clusters.setdefault(find(row), []).append(row)
+
+    kept = []
+    for root in sorted(clusters):
+        canonical = documents[root]
+        citations = []
+        for row in clusters[root]:
+            # A chunk deduplicated before (e.g. within its PDF) brings its citations along
+            for citation in documents[row].metadata.get("citations") or [_citation(documents[row])]:
+                if citation not in citations:
+                    citations.append(citation)
+        if len(clusters[root]) > 1:
+            canonical.metadata["citations"] = citations
+        kept.append(canonical)
+    print(f"🐞 [dedup] {len(documents)} chunks -> {len(kept)} "
+          f"({len(documents) - len(kept)} near-duplicates merged)")
+    return kept
+
+
+class StreamingDeduplicator:
+    """deduplicate_chunks for chunks that arrive batch by batch, e.g. while a PDF is parsed.
+
+    Only the MinHash signatures and LSH buckets of the chunks kept so far are
+    held (64 integers per chunk, not the text), so each new chunk is compared
+    with every earlier one of the document. A duplicate is compared with kept
+    chunks, not with other duplicates. reset() starts a new document.
+    """
+
+    def __init__(self, similarity: float = DEFAULT_SIMILARITY, bands: int = LSH_BANDS):
+        self.similarity = similarity
+        self.bands = bands
+        self.reset()
+
+    def reset(self) -> None:
+        self.signatures: List[np.ndarray] = []
+        self.buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self.seen = 0
+
+    @property
+    def kept(self) -> int:
+        return len(self.signatures)
+
+    def filter(self, documents: List[Document]) -> Tuple[List[Document], List[Tuple[int, Dict[str, Any]]]]:
+        """Split a batch into new chunks and duplicates.
+
+        Duplicates are (position of the kept copy among the document's kept
+        chunks, citation of the duplicate) pairs.
+        """
+        signatures = minhash_signatures([doc.page_content for doc in documents])
+        rows_per_band = signatures.shape[1] // self.bands
+        kept, duplicates = [], []
+        for doc, signature in zip(documents, signatures):
+            keys = [(band, signature[band * rows_per_band:(band + 1) * rows_per_band].tobytes())
+                    for band in range(self.bands)]
+            candidates = sorted({i for key in keys for i in self.buckets.get(key, [])})
+            match = next((i for i in candidates
+                          if (self.signatures[i] == signature).mean() >= self.similarity), None)
+            if match is not None:
+                duplicates.append((match, _citation(doc)))
+                continue
+            for key in keys:
+                self.buckets.setdefault(key, []).append(self.kept)
+            self.signatures.append(signature)
+            kept.append(doc)
+        self.seen += len(documents)
+        return kept, duplicates
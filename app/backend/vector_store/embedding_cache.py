@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+DEFAULT_CACHE_PATH = Path("app") / "data" / "embedding_cache.sqlite"
+
+# Encode options that do not change the vectors and are left out of the key
+_IGNORED_ENCODE_KWARGS = {"batch_size", "show_progress_bar"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    dim INTEGER NOT NULL,
+    vector BLOB NOT NULL
+)
+"""
+
+
+def get_embedding_cache_path() -> Path:
+    """Cache location; EMBEDDING_CACHE_PATH overrides the default under app/data"""
+    return Path(os.getenv("EMBEDDING_CACHE_PATH", str(DEFAULT_CACHE_PATH)))
+
+
+def embedder_fingerprint(embedder: Any) -> str:
+    """Model name plus the encode options that affect the vectors"""
+    name = getattr(embedder, "model_name", type(embedder).__name__)
+    encode_kwargs = {k: v for k, v in (getattr(embedder, "encode_kwargs", None) or {}).items()
+                     if k not in _IGNORED_ENCODE_KWARGS}
+    return f"{name}|{json.dumps(encode_kwargs, sort_keys=True, default=str)}"
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-insensitive form of a chunk; re-extraction often only reflows lines"""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class EmbeddingCache:
+    """SQLite store of embeddings keyed by sha256(embedder fingerprint, normalized text).
+
+    WAL mode lets parallel ingestion threads and processes read while one writes.
+    Each thread gets its own connection.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or get_embedding_cache_path())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(fingerprint: str, text: str) -> str:
+        return hashlib.sha256(f"{fingerprint}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        conn = self._connection()
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype='float32')
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vector) VALUES (?, ?, ?)",
+                [(key, len(vector), np.asarray(vector, dtype='float32').tobytes())
+                 for key, vector in items.items()]
+            )
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class CachedEmbeddings:
+    """Embeddings wrapper that only sends cache misses to the wrapped model"""
+
+    def __init__(self, embedder: Any, cache: Optional[EmbeddingCache] = None):
+        self.embedder = embedder
+        self.cache = cache or EmbeddingCache()
+        self.fingerprint = embedder_fingerprint(embedder)
+        self.model_name = getattr(embedder, "model_name", type(embedder).__name__)
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [EmbeddingCache.key(self.fingerprint, text) for text in texts]
+        vectors = self.cache.get_many(list(dict.fromkeys(keys)))
+        # Embed each missing text once, even if it occurs several times in the batch
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            embedded = self.embedder.embed_documents(list(missing.values()))
+            fresh = {key: np.asarray(vector, dtype='float32') for key, vector in zip(missing, embedded)}
+            self.cache.put_many(fresh)
+            vectors.update(fresh)
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        print(f"🐞 [EmbeddingCache] {len(texts) - len(missing)} cached, {len(missing)} embedded")
+        return [vectors[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embedder.embed_query(text)
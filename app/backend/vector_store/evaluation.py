@@ -0,0 +1,121 @@
+import time
+from typing import List, Dict, Any, Optional
+import numpy as np
+import faiss
+
+from app.backend.vector_store.segment_store import SegmentStore
+from app.backend.vector_store.calibration import score_matrix
+from app.backend.vector_store.numpy_index import NumpyIndex
+
+
+def index_bytes_per_vector(retriever: Any) -> float:
+    """Serialized index size per live vector (codes plus index overhead)"""
+    total = sum(
+        s.index.nbytes if isinstance(s.index, NumpyIndex) else faiss.serialize_index(s.index).nbytes
+        for s in retriever.segments
+    )
+    vectors = sum(s.index.ntotal for s in retriever.segments)
+    return total / max(vectors, 1)
+
+
+def recall_at_k(
+    embedder: Any,
+    persist_path: str,
+    queries: List[str],
+    k: int = 3,
+    search_kwargs: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Compare retriever hits with an exact float32 search over the stored vectors"""
+    from app.backend.vector_store.faiss_store import load_faiss_index
+
+    retriever = load_faiss_index(
+        embedder, persist_path, {**(search_kwargs or {}), 'k': k, 'score_threshold': None}
+    )
+    store = SegmentStore(persist_path)
+    query_vectors = np.array([embedder.embed_query(q) for q in queries], dtype='float32')
+    if retriever.metric == 'ip':
+        faiss.normalize_L2(query_vectors)
+
+    # Exact ground truth per query: (score, segment name, row), over the snapshot the
+    # retriever serves; the working catalog may already hold unpublished compactions
+    truth: List[list] = [[] for _ in queries]
+    for name, rows, vectors in store.iter_live_vectors(retriever.metadata.get('catalog')):
+        scores = score_matrix(query_vectors, vectors, retriever.metric)
+        for qi in range(len(queries)):
+            truth[qi].extend(zip(scores[qi].tolist(), [name] * len(rows), rows.tolist()))
+
+    _, segment_ids, rows = retriever._search_batch(query_vectors, k)
+    found = 0
+    for qi in range(len(queries)):
+        truth[qi].sort(key=lambda hit: hit[0], reverse=retriever.metric == 'ip')
+        expected = {(name, row) for _, name, row in truth[qi][:k]}
+        hits = {(retriever.segments[s].name, int(r)) for s, r in zip(segment_ids[qi], rows[qi]) if r != -1}
+        found += len(expected & hits)
+
+    dimension = query_vectors.shape[1]
+    bytes_per_vector = index_bytes_per_vector(retriever)
+    return {
+        "recall": found / max(len(queries) * k, 1),
+        "k": k,
+        "queries": len(queries),
+        "index_types": sorted({s.index_type for s in retriever.segments}),
+        "bytes_per_vector": bytes_per_vector,
+        "compression": 4 * dimension / bytes_per_vector,
+    }
+
+
+def _time_per_query(search, queries: np.ndarray, k: int, repeats: int = 3) -> float:
+    """Best-of-repeats milliseconds per query, issuing one query at a time"""
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for i in range(len(queries)):
+            search(queries[i:i + 1], k)
+        best = min(best, time.perf_counter() - start)
+    return 1000 * best / len(queries)
+
+
+def benchmark_backends(
+    persist_path: str,
+    sizes: Optional[List[int]] = None,
+    k: int = 3,
+    n_queries: int = 200
+) -> List[Dict[str, Any]]:
+    """Latency and top-k agreement of NumPy matrix search vs IndexFlat.
+
+    Runs on the store's live vectors; sizes larger than the corpus are filled with
+    jittered copies so growth can be estimated. Queries are perturbed corpus vectors.
+    """
+    store = SegmentStore(persist_path)
+    metric = store.read_catalog().get("metric", "l2")
+    corpus = store.live_vectors()
+    if len(corpus) == 0:
+        raise ValueError(f"Vectorstore at {persist_path} has no live chunks")
+    rng = np.random.default_rng(0)
+    results = []
+    for size in sizes or [len(corpus)]:
+        # Every corpus vector once, then jittered repeats up to the requested size
+        picks = np.resize(rng.permutation(len(corpus)), size)
+        vectors = corpus[picks] + (np.arange(size) >= len(corpus))[:, None] * rng.normal(
+            0, 0.01, size=(size, corpus.shape[1])).astype('float32')
+        vectors = np.ascontiguousarray(vectors, dtype='float32')
+        queries = vectors[rng.integers(0, size, size=n_queries)] + rng.normal(
+            0, 0.05, size=(n_queries, corpus.shape[1])).astype('float32')
+        if metric == "ip":
+            faiss.normalize_L2(vectors)
+            faiss.normalize_L2(queries)
+
+        flat = faiss.IndexFlat(vectors.shape[1], faiss.METRIC_INNER_PRODUCT if metric == "ip" else faiss.METRIC_L2)
+        flat.add(vectors)
+        _, expected = flat.search(queries, k)
+        row = {"size": size, "flat_ms": _time_per_query(flat.search, queries, k)}
+        for dtype in ("float32", "float16"):
+            index = NumpyIndex(vectors.astype(dtype), metric)
+            _, found = index.search(queries, k)
+            row[f"numpy_{dtype}_ms"] = _time_per_query(index.search, queries, k)
+            row[f"numpy_{dtype}_agreement"] = float(np.mean([
+                len(set(expected[i]) & set(found[i])) / k for i in range(n_queries)
+            ]))
+        row["float16_mb"] = size * vectors.shape[1] * 2 / 1e6
+        results.append(row)
+    return results
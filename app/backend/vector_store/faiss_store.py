@@ -1,4 +1,9 @@
+import asyncio
+import functools
+import json
 import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import faiss
 import pickle
@@ -6,9 +11,43 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional
 from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
-from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun
+)
 from pydantic import ConfigDict
 
+from app.backend.vector_store.segment_store import (
+    Segment, SegmentStore, document_key, hide_staged, shared_key, shared_citations
+)
+from app.backend.vector_store.calibration import load_calibration
+from app.backend.vector_store.index_factory import read_index
+from app.backend.vector_store.numpy_index import NumpyIndex
+from app.backend.vector_store.dedup import deduplicate_chunks, _citation
+from app.backend.vector_store.embedding_cache import CachedEmbeddings
+from app.backend.retriever.pdf.batching import BucketedEmbeddings
+from app.backend.vector_store.query_cache import QueryCache
+from app.backend.vector_store.filters import resolve_filter
+from app.backend.vector_store.lexical import BM25, reciprocal_rank_fusion
+from app.backend.vector_store.mmr import maximal_marginal_relevance, DEFAULT_FETCH_K, DEFAULT_LAMBDA_MULT
+
+# Used for score_threshold='auto' on L2 stores that were never calibrated
+DEFAULT_L2_THRESHOLD = 0.85
+# Candidates fetched per requested hit from compressed (SQ8/PQ) segments
+DEFAULT_RERANK_FACTOR = 4
+# Hybrid retrieval: candidates taken from each ranker and the RRF rank constant
+DEFAULT_HYBRID_CANDIDATES = 20
+DEFAULT_RRF_K = 60
+
+# Bounded pool for async retrieval; FAISS and NumPy release the GIL while searching
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "4"))
+_RETRIEVAL_EXECUTOR = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+
+
+def get_vectorstore_path(domain_name: str) -> Path:
+    """Vectorstore directory of a domain"""
+    return Path("app") / "data" / "domains" / domain_name / "vectorstore"
+
 class FAISSRetriever(BaseRetriever):
     """Complete debugged implementation of FAISS retriever"""
     
@@ -20,51 +59,91 @@ class FAISSRetriever(BaseRetriever):
         index: Any,  # faiss.Index type causes Pydantic issues
         embedder: Any,
         metadata: Dict[str, Any],
-        search_kwargs: Optional[Dict] = None
+        search_kwargs: Optional[Dict] = None,
+        segments: Optional[List[Segment]] = None,
+        query_cache: Optional[QueryCache] = None
     ):
         super().__init__()
         print(f"🐞 [FAISSRetriever] Initializing with index: {type(index)}")  # Debug
         
+        # A single legacy index is searched as one segment
+        if segments is None:
+            segments = [Segment("index", index, metadata['chunks'])]
+        
         # Manually set attributes (bypass Pydantic validation)
         object.__setattr__(self, 'index', index)
         object.__setattr__(self, 'embedder', embedder)
         object.__setattr__(self, 'metadata', metadata)
         object.__setattr__(self, 'search_kwargs', search_kwargs or {'k': 3})
+        object.__setattr__(self, 'segments', segments)
+        object.__setattr__(self, 'metric', segments[0].metric if segments
+                           else metadata.get('catalog', {}).get('metric', 'l2'))
+        object.__setattr__(self, '_bm25', None)
+        
+        # Cached results are keyed by the snapshot served; unpublished stores get a
+        # one-off version so a shared cache never mixes them up
+        object.__setattr__(self, 'version', metadata.get('snapshot') or uuid.uuid4().hex)
+        object.__setattr__(self, 'query_cache', query_cache if query_cache is not None else QueryCache())
+        self.query_cache.set_version(self.version)
         
         print("🐞 [FAISSRetriever] Initialization complete")  # Debug
 
+    def _score_threshold(self) -> Optional[float]:
+        """Resolve search_kwargs['score_threshold']; 'auto' uses the calibrated cutoff.
+
+        The cutoff only applies to the metric and embedder it was calibrated for;
+        otherwise the default is used and a warning is printed once.
+        """
+        threshold = self.search_kwargs.get('score_threshold')
+        if threshold != 'auto':
+            return threshold
+        calibration = self.metadata.get('calibration')
+        if calibration and calibration.get('metric') == self.metric:
+            embedder = getattr(self.embedder, 'model_name', type(self.embedder).__name__)
+            if calibration.get('embedder') == embedder:
+                return calibration['cutoff']
+            if not getattr(self, '_calibration_warned', False):
+                print(f"⚠️ [FAISSRetriever] Calibrated cutoff is for {calibration.get('embedder')}, "
+                      f"not {embedder}; using the default (re-run `cli calibrate`)")
+                object.__setattr__(self, '_calibration_warned', True)
+        return DEFAULT_L2_THRESHOLD if self.metric == 'l2' else None
+
     def _get_relevant_documents(
         self,
         query: str,
         *,
-        run_manager: CallbackManagerForRetrieverRun = None
+        run_manager: CallbackManagerForRetrieverRun = None,
+        **kwargs: Any
     ) -> List[Document]:
-        """Debugged retrieval method"""
+        """Debugged retrieval method. k and a metadata filter may be passed per call
+        (retriever.invoke(query, k=20, filter={...})) or set in search_kwargs."""
         try:
             print(f"🐞 [Retrieval] Processing query: {query[:50]}...")  # Debug
             
-            # 1. Generate embedding
+            # 1. Generate embedding (repeated questions reuse the cached one)
             print("🐞 [Retrieval] Generating embedding...")
-            embedding = self.embedder.embed_query(query)
+            embedding = np.array([self.query_cache.embedding(query, self.embedder.embed_query)], dtype='float32')
+            if self.metric == 'ip':
+                faiss.normalize_L2(embedding)
             
             # 2. Perform search
-            k = self.search_kwargs.get('k', 3)
-            print(f"🐞 [Retrieval] Searching with k={k}...")
-            distances, indices = self.index.search(
-                np.array([embedding], dtype='float32'), 
-                k
-            )
-            print(f"🐞 [Retrieval] Found {len(indices[0])} results")  # Debug
+            k = kwargs.get('k', self.search_kwargs.get('k', 3))
+            filter_spec = kwargs.get('filter', self.search_kwargs.get('filter'))
+            print(f"🐞 [Retrieval] Searching with k={k} over {len(self.segments)} segments, "
+                  f"filter={filter_spec}, hybrid={self.search_kwargs.get('hybrid', False)}...")
             
-            # 3. Apply score threshold
-            score_threshold = self.search_kwargs.get('score_threshold')
-            results = []
-            for i, (dist, idx) in enumerate(zip(distances[0], indices[0])):
-                if score_threshold is None or dist <= score_threshold:
-                    doc = self.metadata['chunks'][idx]
-                    doc.metadata['score'] = float(dist)
-                    results.append(doc)
-                    print(f"🐞 [Result {i+1}] Score: {dist:.3f}, Page: {doc.metadata.get('page_number', '?')}")
+            # 3. Search and apply score threshold, or reuse the hits of an identical search
+            key = QueryCache.result_key(
+                embedding, k, filter_spec, self.search_kwargs, self.version,
+                query if self.search_kwargs.get('hybrid', False) else ""
+            )
+            scores, segment_ids, rows, keep = self.query_cache.result(
+                key, lambda: self._rank([query], embedding, k, filter_spec)
+            )
+            print(f"🐞 [Retrieval] Found {int(keep[0].sum())} results")  # Debug
+            results = self._materialize(scores[0], segment_ids[0], rows[0], keep[0])
+            for i, doc in enumerate(results):
+                print(f"🐞 [Result {i+1}] Score: {doc.metadata['score']:.3f}, Page: {doc.metadata.get('page_number', '?')}")
             
             return results
             
@@ -72,27 +151,297 @@ class FAISSRetriever(BaseRetriever):
             print(f"❌ [Retrieval Error] {str(e)}")
             return []
 
+    async def _aget_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: AsyncCallbackManagerForRetrieverRun = None,
+        **kwargs: Any
+    ) -> List[Document]:
+        """Async retrieval (ainvoke): embedding and search run on the bounded retrieval
+        pool, so concurrent requests overlap instead of blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _RETRIEVAL_EXECUTOR,
+            functools.partial(self._get_relevant_documents, query, **kwargs)
+        )
+
+    def batch_get_relevant_documents(
+        self,
+        queries: List[str],
+        k: Optional[int] = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Document]]:
+        """Retrieve for many queries with one embedding call and one search per segment"""
+        if not queries:
+            return []
+        k = k or self.search_kwargs.get('k', 3)
+        print(f"🐞 [Retrieval] Batch of {len(queries)} queries, k={k}")  # Debug
+        embeddings = np.array(self.embedder.embed_documents(list(queries)), dtype='float32')
+        if self.metric == 'ip':
+            faiss.normalize_L2(embeddings)
+        
+        filter_spec = filter if filter is not None else self.search_kwargs.get('filter')
+        scores, segment_ids, rows, keep = self._rank(list(queries), embeddings, k, filter_spec)
+        return [
+            self._materialize(scores[i], segment_ids[i], rows[i], keep[i])
+            for i in range(len(queries))
+        ]
+
+    def _rank(
+        self,
+        queries: List[str],
+        embeddings: np.ndarray,
+        k: int,
+        filter_spec: Optional[Dict[str, Any]] = None
+    ):
+        """(scores, segment_ids, rows, keep) for a batch, dense or hybrid per search_kwargs.
+
+        With search_type='mmr', fetch_k candidates are retrieved first and k of them
+        are picked by maximal marginal relevance.
+        """
+        mmr = self.search_kwargs.get('search_type') == 'mmr'
+        fetch = max(k, self.search_kwargs.get('fetch_k', DEFAULT_FETCH_K)) if mmr else k
+        if self.search_kwargs.get('hybrid', False):
+            scores, segment_ids, rows = self._hybrid_batch(queries, embeddings, fetch, filter_spec)
+            keep = rows != -1
+        else:
+            scores, segment_ids, rows = self._search_batch(embeddings, fetch, filter_spec)
+            keep = self._threshold_mask(scores, rows)
+        if mmr:
+            return self._mmr(embeddings, scores, segment_ids, rows, keep, k)
+        return scores, segment_ids, rows, keep
+
+    def _mmr(
+        self,
+        embeddings: np.ndarray,
+        scores: np.ndarray,
+        segment_ids: np.ndarray,
+        rows: np.ndarray,
+        keep: np.ndarray,
+        k: int
+    ):
+        """Diversify each query's kept candidates down to k with MMR"""
+        lambda_mult = self.search_kwargs.get('lambda_mult', DEFAULT_LAMBDA_MULT)
+        n = len(embeddings)
+        out_scores = np.zeros((n, k), dtype=scores.dtype)
+        out_segments = np.zeros((n, k), dtype='int64')
+        out_rows = np.full((n, k), -1, dtype='int64')
+        for i in range(n):
+            positions = np.flatnonzero(keep[i])
+            if not len(positions):
+                continue
+            vectors = np.empty((len(positions), embeddings.shape[1]), dtype='float32')
+            for segment_id in np.unique(segment_ids[i][positions]):
+                mask = segment_ids[i][positions] == segment_id
+                vectors[mask] = self.segments[segment_id].reconstruct(rows[i][positions][mask])
+            chosen = positions[maximal_marginal_relevance(embeddings[i], vectors, k, lambda_mult)]
+            out_scores[i, :len(chosen)] = scores[i][chosen]
+            out_segments[i, :len(chosen)] = segment_ids[i][chosen]
+            out_rows[i, :len(chosen)] = rows[i][chosen]
+        return out_scores, out_segments, out_rows, out_rows != -1
+
+    def _lexical_index(self) -> BM25:
+        """BM25 over all segments, built on first hybrid query"""
+        if self._bm25 is None:
+            object.__setattr__(self, '_bm25', BM25(
+                [segment.lexical for segment in self.segments],
+                [segment.live_mask for segment in self.segments]
+            ))
+        return self._bm25
+
+    def _hybrid_batch(
+        self,
+        queries: List[str],
+        embeddings: np.ndarray,
+        k: int,
+        filter_spec: Optional[Dict[str, Any]] = None
+    ):
+        """Dense and BM25 candidates merged with reciprocal rank fusion.
+
+        The score threshold applies to the dense candidates only; exact term matches
+        (form numbers, acronyms) can enter through the lexical list. Scores of the
+        fused result are RRF scores (higher is better).
+        """
+        candidates = max(k, self.search_kwargs.get('hybrid_candidates', DEFAULT_HYBRID_CANDIDATES))
+        rrf_k = self.search_kwargs.get('rrf_k', DEFAULT_RRF_K)
+        scores, segment_ids, rows = self._search_batch(embeddings, candidates, filter_spec)
+        keep = self._threshold_mask(scores, rows)
+
+        masks = None
+        if filter_spec:
+            masks = [resolve_filter(segment.metadata_index, filter_spec, segment.live_ids).mask
+                     for segment in self.segments]
+        bm25 = self._lexical_index()
+
+        n = len(queries)
+        fused_scores = np.zeros((n, k), dtype='float32')
+        fused_segments = np.zeros((n, k), dtype='int64')
+        fused_rows = np.full((n, k), -1, dtype='int64')
+        for i, query in enumerate(queries):
+            dense = list(zip(segment_ids[i][keep[i]].tolist(), rows[i][keep[i]].tolist()))
+            lexical = [(segment_id, row) for _, segment_id, row in bm25.search(query, candidates, masks)]
+            fused = reciprocal_rank_fusion([dense, lexical], rrf_k)[:k]
+            for j, ((segment_id, row), score) in enumerate(fused):
+                fused_scores[i, j], fused_segments[i, j], fused_rows[i, j] = score, segment_id, row
+        return fused_scores, fused_segments, fused_rows
+
+    def _threshold_mask(self, scores: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Vectorized score threshold over an (n, k) result matrix"""
+        keep = rows != -1
+        threshold = self._score_threshold()
+        if threshold is None:
+            return keep
+        return keep & (scores >= threshold if self.metric == 'ip' else scores <= threshold)
+
+    def _materialize(
+        self,
+        scores: np.ndarray,
+        segment_ids: np.ndarray,
+        rows: np.ndarray,
+        keep: np.ndarray
+    ) -> List[Document]:
+        """Build Documents for the kept hits of one query.
+
+        Every hit is a new Document with its own metadata dict: legacy segments hand
+        out shared objects, and concurrent queries must not overwrite each other's scores.
+        """
+        results = []
+        for score, segment_id, row in zip(scores[keep], segment_ids[keep], rows[keep]):
+            doc = self.segments[segment_id].chunks[int(row)]
+            metadata = {**doc.metadata, 'score': float(score)}
+            if 'shared_key' in metadata:
+                # Cite the documents that contain the chunk in the served snapshot; the
+                # copy the chunk was stored from may have been deleted since
+                citations = shared_citations(self.metadata.get('catalog', {}), metadata['shared_key'])
+                if citations:
+                    metadata['citations'] = citations
+                    if metadata.get('filename') not in {c.get('filename') for c in citations}:
+                        metadata.update(citations[0])
+            results.append(Document(page_content=doc.page_content, metadata=metadata))
+        return results
+
+    def _worst_score(self) -> float:
+        return -np.inf if self.metric == 'ip' else np.inf
+
+    def _top_k(self, scores: np.ndarray, *columns: np.ndarray, k: int) -> List[np.ndarray]:
+        """Best k entries per row of scores, with aligned columns"""
+        order = np.argsort(-scores if self.metric == 'ip' else scores, axis=1, kind='stable')[:, :k]
+        return [np.take_along_axis(a, order, axis=1) for a in (scores, *columns)]
+
+    def _search_batch(
+        self,
+        queries: np.ndarray,
+        k: int,
+        filter_spec: Optional[Dict[str, Any]] = None
+    ):
+        """Search every live segment with an (n, d) query matrix and merge per query.
+
+        filter_spec (e.g. {'filename': 'Checklist.pdf', 'page_number': {'lte': 3}}) is
+        resolved per segment through its inverted metadata index into an ID selector.
+        Returns (scores, segment_ids, rows), each of shape (n, k); empty slots have row -1.
+        """
+        n = len(queries)
+        worst = self._worst_score()
+        rerank = self.search_kwargs.get('rerank', True)
+        rerank_factor = self.search_kwargs.get('rerank_factor', DEFAULT_RERANK_FACTOR)
+        all_scores = [np.full((n, k), worst, dtype='float32')]
+        all_segments = [np.zeros((n, k), dtype='int64')]
+        all_rows = [np.full((n, k), -1, dtype='int64')]
+        for segment_id, segment in enumerate(self.segments):
+            resolved, candidates = None, segment.live_count
+            if filter_spec:
+                resolved = resolve_filter(segment.metadata_index, filter_spec, segment.live_ids)
+                candidates = resolved.count
+            if candidates == 0:
+                continue
+            # Compressed segments over-fetch and re-score exactly against float16 vectors
+            exact = rerank and segment.compressed and segment.side_vectors is not None
+            fetch = min(k * rerank_factor if exact else k, candidates)
+            distances, indices = segment.search(queries, fetch, self.search_kwargs, resolved)
+            missing = indices == -1
+            if exact:
+                distances = self._exact_scores(queries, segment.side_vectors[np.where(missing, 0, indices)])
+            distances = np.where(missing, worst, distances).astype('float32')
+            if exact:
+                distances, indices = self._top_k(distances, indices, k=k)
+            all_scores.append(distances)
+            all_segments.append(np.full(indices.shape, segment_id, dtype='int64'))
+            all_rows.append(indices)
+        return self._top_k(
+            np.concatenate(all_scores, axis=1),
+            np.concatenate(all_segments, axis=1),
+            np.concatenate(all_rows, axis=1),
+            k=k
+        )
+
+    def _exact_scores(self, queries: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+        """Exact float32 scores of (n, m, d) candidate vectors for (n, d) queries, in FAISS units"""
+        vectors = vectors.astype('float32')
+        if self.metric == 'ip':
+            return np.einsum('nmd,nd->nm', vectors, queries)
+        return ((vectors - queries[:, None, :]) ** 2).sum(axis=2)
+
 def load_faiss_index(
     embedder: Any,
     persist_path: str,
-    search_kwargs: Optional[Dict] = None
+    search_kwargs: Optional[Dict] = None,
+    mmap: bool = False,
+    prefault: bool = False,
+    backend: str = "faiss",
+    query_cache: Optional[QueryCache] = None
 ) -> FAISSRetriever:
-    """Debugged FAISS index loader"""
+    """Debugged FAISS index loader.
+
+    Segment stores are loaded at their published snapshot (CURRENT) when there is
+    one. mmap=True maps index files read-only so worker processes share one copy in
+    the page cache; prefault=True warms that cache at startup instead of on first query.
+    backend="numpy" searches the stored (float16 where available) vectors exactly
+    with NumPy instead of FAISS; both backends return the same retriever type.
+    query_cache may be shared across reloads so embeddings of frequent questions
+    survive a snapshot change (cached results do not).
+    """
     print(f"🐞 [FAISS] Loading from: {persist_path}") 
     print(f"🐞 [FAISS] Expected files: {Path(persist_path)/'index.faiss'} and {Path(persist_path)/'index.pkl'}")
     
     index_path = Path(persist_path) / "index.faiss"
     meta_path = Path(persist_path) / "index.pkl"
+    store = SegmentStore(persist_path)
     
     # 1. Validate paths
-    if not index_path.exists():
+    if not store.exists() and not index_path.exists():
         raise FileNotFoundError(f"FAISS index not found at {index_path}")
     print("🐞 [load_faiss_index] Paths validated")
 
     # 2. Load index and metadata
     try:
+        if store.exists():
+            snapshot = store.current_snapshot()
+            catalog = store.read_snapshot(snapshot) if snapshot else hide_staged(store.read_catalog())
+            print(f"🐞 [load_faiss_index] Loading segments of snapshot {snapshot or '(unpublished)'}...")
+            segments = store.load_segments(mmap=mmap, prefault_pages=prefault,
+                                           catalog=catalog, backend=backend)
+            print(f"🐞 [load_faiss_index] Loaded {len(segments)} segments, "
+                  f"{sum(s.live_count for s in segments)} live chunks, "
+                  f"index types: {sorted({s.index_type for s in segments})}")  # Debug
+            return FAISSRetriever(
+                index=None,
+                embedder=embedder,
+                metadata={
+                    'embedder': embedder.model_name,
+                    'catalog': catalog,
+                    'snapshot': snapshot,
+                    'calibration': load_calibration(persist_path)
+                },
+                search_kwargs=search_kwargs or {'k': 3, 'score_threshold': 'auto'},
+                segments=segments,
+                query_cache=query_cache
+            )
+        
         print("🐞 [load_faiss_index] Loading FAISS index...")
-        index = faiss.read_index(str(index_path))
+        index = read_index(index_path, mmap=mmap)
+        if backend == "numpy":
+            index = NumpyIndex.from_faiss(index)
         
         print("🐞 [load_faiss_index] Loading metadata...")
         with open(meta_path, "rb") as f:
@@ -106,7 +455,8 @@ def load_faiss_index(
             index=index,
             embedder=embedder,
             metadata=metadata,
-            search_kwargs=search_kwargs or {'k': 3, 'score_threshold': 0.85}
+            search_kwargs=search_kwargs or {'k': 3, 'score_threshold': 0.85},
+            query_cache=query_cache
         )
     except Exception as e:
         print(f"❌ [load_faiss_index] Failed: {str(e)}")
@@ -117,55 +467,200 @@ def build_faiss_index(
     documents: List[Document],
     embedder: Any,
     domain_name: str,
-    index_name: str = "index"
+    compact: bool = True,
+    index_type: str = "auto",
+    index_params: Optional[Dict[str, Any]] = None,
+    metric: Optional[str] = None,
+    dedup: bool = True,
+    embedding_cache: bool = True,
+    bucketed: bool = True
 ) -> None:
-    print(f"\n=== DEBUG: Path Verification ===")
-    persist_path = Path("app") / "data" / "domains" / domain_name / "vectorstore"
-    print(f"Relative path: {persist_path}")
-    print(f"Absolute path: {persist_path.absolute()}")
-    print(f"Parent exists: {persist_path.parent.exists()}")
+    """Upsert documents into the domain's segment store.
+
+    Chunks are grouped by source PDF; each PDF becomes a new segment that replaces
+    its previous version, so only the changed documents are embedded and written.
+    index_type is one of flat / ivf_flat / ivf_pq / hnsw / sq8 / pq, or "auto" to
+    choose by segment size; compressed types also keep a float16 copy of the
+    vectors for exact re-ranking. index_params may set nlist, pq_m, hnsw_m and
+    ef_construction.
+    compact merges small segments on a background thread after the build is
+    published; the merged layout is published as its own snapshot.
+    metric "ip" stores normalized vectors for cosine scoring; None keeps the
+    store's existing metric (l2 for new stores).
+    dedup merges near-duplicate chunks before embedding; the kept chunk lists
+    every copy's (filename, page_number) in metadata['citations']. A chunk found
+    in several PDFs is stored once as a shared chunk referenced by each of them,
+    so deleting one PDF keeps it for the others (see SegmentStore.add_shared).
+    embedding_cache reuses vectors of chunks whose text was embedded before by the
+    same model (SQLite cache, see EMBEDDING_CACHE_PATH); only new text is embedded.
+    bucketed embeds the chunks in batches of similar token length under a token
+    budget (see BucketedEmbeddings; it matters for embedders that do not sort).
+    """
+    persist_path = get_vectorstore_path(domain_name)
+    print(f"🐞 [build_faiss_index] Building index for {len(documents)} documents")
+    print(f"🐞 [FAISS] Writing to: {persist_path.absolute()}")
     
     # Create directory if needed
     persist_path.mkdir(parents=True, exist_ok=True)
-    print(f"Directory created: {persist_path.exists()}")
-    """Build and persist FAISS index from documents"""
-    print(f"🐞 [build_faiss_index] Building index for {len(documents)} documents")
     
     try:
-        # 1. Create embeddings
-        texts = [doc.page_content for doc in documents]
-        embeddings = embedder.embed_documents(texts)
+        store = SegmentStore(persist_path, index_type=index_type,
+                             index_params=index_params, metric=metric)
+        _migrate_legacy_index(store, persist_path)
         
-        # 2. Create and build index
-        dimension = len(embeddings[0])
-        index = faiss.IndexFlatL2(dimension)
-        index.add(np.array(embeddings, dtype='float32'))
+        # 1. Merge repeated paragraphs, within and across PDFs
+        if dedup:
+            documents = deduplicate_chunks(documents)
         
-        # 3. Prepare metadata
-        metadata = {
-            'chunks': documents,
-            'embedder': embedder.model_name,
-            'dimension': dimension
-        }
+        # 2. Embed every chunk in one call, so batches are formed across documents
+        model_name = getattr(embedder, 'model_name', type(embedder).__name__)
+        if bucketed:
+            embedder = BucketedEmbeddings(embedder)
+        if embedding_cache:
+            embedder = CachedEmbeddings(embedder)
+        embeddings = np.array(embedder.embed_documents([doc.page_content for doc in documents]),
+                              dtype='float32')
         
-        # 4. Create directory structure (fixed path)
-        persist_path = Path("app") / "data" / "domains" / domain_name / "vectorstore"
-        print(f"🐞 [FAISS] Writing to: {persist_path}")
-        persist_path.mkdir(parents=True, exist_ok=True)
+        # 3. One segment per document, published in one step
+        _write_documents(store, documents, embeddings, model_name, compact)
         
-        # After writing the files, add:
-        print("\n=== File Write Verification ===")
-        print(f"index.faiss exists: {(persist_path / 'index.faiss').exists()}")
-        print(f"index.pkl exists: {(persist_path / 'index.pkl').exists()}")
-
-
-        # 5. Persist to disk
-        faiss.write_index(index, str(persist_path / f"{index_name}.faiss"))
-        with open(persist_path / f"{index_name}.pkl", "wb") as f:
-            pickle.dump(metadata, f)
-        print(f"🐞 [FAISS] Files created: {os.listdir(persist_path)}")   
+        print(f"🐞 [FAISS] Live documents: {store.documents()}")
         print(f"✅ Saved FAISS index to {persist_path}")
         
     except Exception as e:
         print(f"❌ Failed to build index: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+def _write_documents(
+    store: SegmentStore,
+    documents: List[Document],
+    embeddings: np.ndarray,
+    model_name: str,
+    compact: bool
+) -> Dict[str, List[int]]:
+    """Upsert each source document as its own segment, publish, then compact in the background.
+
+    Chunks whose citations span several documents, or whose text is already
+    stored as a shared chunk, are written (or referenced) once as shared
+    chunks. Returns the chunk ids written per document key.
+    """
+    stored_shared = store.read_catalog().get('shared', {})
+    rows_by_doc: Dict[str, List[int]] = {}
+    shared_rows: List[int] = []
+    shared_refs: List[Dict[str, List[Dict[str, Any]]]] = []
+    for row, doc in enumerate(documents):
+        refs: Dict[str, List[Dict[str, Any]]] = {}
+        for citation in doc.metadata.get('citations') or [_citation(doc)]:
+            refs.setdefault(citation.get('filename') or document_key(doc), []).append(citation)
+        key = shared_key(doc.page_content)
+        if len(refs) > 1 or key in stored_shared:
+            doc.metadata['shared_key'] = key
+            shared_rows.append(row)
+            shared_refs.append(refs)
+        rows_by_doc.setdefault(document_key(doc), []).append(row)
+    
+    # Replace every document of the batch first, releasing its old shared references
+    shared = set(shared_rows)
+    doc_keys = set(rows_by_doc) | {key for refs in shared_refs for key in refs}
+    for doc_key in sorted(doc_keys):
+        own = [row for row in rows_by_doc.get(doc_key, []) if row not in shared]
+        if own:
+            store.upsert(doc_key, [documents[row] for row in own], embeddings[own])
+        else:
+            store.delete(doc_key)
+    if shared_rows:
+        store.add_shared([documents[row] for row in shared_rows], embeddings[shared_rows], shared_refs)
+    
+    # Make the new version visible to running servers in one step
+    store.publish(embedder=model_name)
+    
+    # Merge small segments off the write path; only segments below
+    # SMALL_SEGMENT_ROWS are rewritten, so the cost does not grow with the corpus
+    if compact:
+        store.compact_in_background()
+    return {doc_key: [documents[row].metadata.get('chunk_id', row) for row in rows]
+            for doc_key, rows in rows_by_doc.items()}
+
+
+def merge_shards(
+    shard_dirs: List[Path],
+    domain_name: str,
+    compact: bool = True,
+    index_type: str = "auto",
+    index_params: Optional[Dict[str, Any]] = None,
+    metric: Optional[str] = None,
+    dedup: bool = True
+) -> Dict[str, List[int]]:
+    """Single writer for parallel ingestion: merge embedded shards into the domain's store.
+
+    Each shard directory holds chunks.pkl, embeddings.npy and shard.json
+    (embedder name), as written by pipeline.parallel_ingest. Workers merge
+    near-duplicates within their PDF; dedup merges those across shards into
+    shared chunks as in build_faiss_index. Returns the chunk ids written per
+    document key.
+    """
+    persist_path = get_vectorstore_path(domain_name)
+    persist_path.mkdir(parents=True, exist_ok=True)
+    store = SegmentStore(persist_path, index_type=index_type, index_params=index_params, metric=metric)
+    _migrate_legacy_index(store, persist_path)
+    
+    documents: List[Document] = []
+    blocks: List[np.ndarray] = []
+    model_names = set()
+    for shard_dir in shard_dirs:
+        with open(shard_dir / "chunks.pkl", "rb") as f:
+            documents.extend(pickle.load(f))
+        blocks.append(np.load(shard_dir / "embeddings.npy"))
+        model_names.add(json.loads((shard_dir / "shard.json").read_text())["embedder"])
+    if not documents:
+        print("⚠️ [merge_shards] No chunks to merge")
+        return {}
+    if len(model_names) > 1:
+        raise ValueError(f"Shards were embedded by different models: {sorted(model_names)}")
+    embeddings = np.concatenate(blocks)
+    
+    if dedup:
+        # Vectors of dropped duplicates are simply not written
+        row_of = {id(doc): row for row, doc in enumerate(documents)}
+        documents = deduplicate_chunks(documents)
+        embeddings = embeddings[[row_of[id(doc)] for doc in documents]]
+    
+    print(f"🐞 [merge_shards] Writing {len(documents)} chunks from {len(shard_dirs)} shards")
+    return _write_documents(store, documents, embeddings, model_names.pop(), compact)
+
+
+def delete_from_index(domain_name: str, filename: str) -> bool:
+    """Remove every chunk of a PDF from the domain's vectorstore"""
+    store = SegmentStore(get_vectorstore_path(domain_name))
+    found = store.delete(filename)
+    if found:
+        store.publish()
+    return found
+
+
+def compact_index(
+    domain_name: str,
+    force: bool = True,
+    index_type: str = "auto",
+    index_params: Optional[Dict[str, Any]] = None
+) -> Optional[str]:
+    """Synchronously merge the domain's small segments"""
+    store = SegmentStore(get_vectorstore_path(domain_name), index_type, index_params)
+    name = store.compact(force=force)
+    if name is not None:
+        store.publish()
+    return name
+
+
+def _migrate_legacy_index(store: SegmentStore, persist_path: Path) -> None:
+    """Move an old single-file index.faiss/index.pkl into the segment store once"""
+    index_path = persist_path / "index.faiss"
+    meta_path = persist_path / "index.pkl"
+    if store.exists() or not index_path.exists() or not meta_path.exists():
+        return
+    print(f"🐞 [FAISS] Migrating legacy index at {index_path}")
+    index = faiss.read_index(str(index_path))
+    with open(meta_path, "rb") as f:
+        metadata = pickle.load(f)
+    store.import_legacy(index, metadata['chunks'])
@@ -0,0 +1,118 @@
+import threading
+from typing import Dict, Any, Optional
+import numpy as np
+import faiss
+
+# Metadata fields that can be used in search_kwargs['filter']
+FILTER_FIELDS = ("filename", "domain", "doc_id", "page_number")
+
+RANGE_OPERATORS = {
+    "gt": lambda value, bound: value > bound,
+    "gte": lambda value, bound: value >= bound,
+    "lt": lambda value, bound: value < bound,
+    "lte": lambda value, bound: value <= bound,
+}
+
+
+class MetadataIndex:
+    """Inverted index of one segment: field -> value -> sorted row ids.
+
+    Postings for a field are built once, on first use, from the segment's chunk
+    columns. A filter resolves to a row bitmap by OR-ing postings within a field
+    and AND-ing across fields; the bitmap becomes a FAISS IDSelectorBitmap so that
+    filtering happens inside the search instead of by over-fetching.
+    """
+
+    def __init__(self, chunks: Any):
+        self.chunks = chunks
+        self.rows = len(chunks)
+        self._postings: Dict[str, Dict[Any, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def _codes(self, field: str):
+        """Integer code per row (-1 when missing) and the value of each code"""
+        if hasattr(self.chunks, "codes"):
+            return self.chunks.codes(field)
+        # Legacy segments hold a plain Document list
+        vocab: Dict[Any, int] = {}
+        codes = np.full(self.rows, -1, dtype='int64')
+        for row, doc in enumerate(self.chunks):
+            value = doc.metadata.get(field)
+            if value is not None:
+                codes[row] = vocab.setdefault(value, len(vocab))
+        return codes, list(vocab)
+
+    def postings(self, field: str) -> Dict[Any, np.ndarray]:
+        if field not in self._postings:
+            with self._lock:
+                if field not in self._postings:
+                    codes, values = self._codes(field)
+                    order = np.argsort(codes, kind='stable')
+                    sorted_codes = codes[order]
+                    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+                    ends = np.r_[starts[1:], len(order)]
+                    self._postings[field] = {
+                        values[sorted_codes[start]]: order[start:end].astype('int64')
+                        for start, end in zip(starts, ends)
+                        if sorted_codes[start] != -1
+                    } if len(order) else {}
+        return self._postings[field]
+
+    def _matching_values(self, field: str, condition: Any):
+        values = self.postings(field).keys()
+        if isinstance(condition, dict):
+            if "eq" in condition:
+                return [condition["eq"]]
+            if "in" in condition:
+                return list(condition["in"])
+            unknown = set(condition) - set(RANGE_OPERATORS)
+            if unknown:
+                raise ValueError(f"Unsupported filter operators for '{field}': {sorted(unknown)}")
+            return [
+                value for value in values
+                if all(RANGE_OPERATORS[op](value, bound) for op, bound in condition.items())
+            ]
+        if isinstance(condition, (list, tuple, set)):
+            return list(condition)
+        return [condition]
+
+    def mask(self, filter_spec: Dict[str, Any]) -> np.ndarray:
+        """Boolean row mask for a filter such as
+        {'filename': 'Checklist.pdf', 'page_number': {'gte': 2, 'lte': 5}}"""
+        mask = np.ones(self.rows, dtype=bool)
+        for field, condition in filter_spec.items():
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"Cannot filter on '{field}'. Filterable fields: {FILTER_FIELDS}")
+            field_mask = np.zeros(self.rows, dtype=bool)
+            postings = self.postings(field)
+            for value in self._matching_values(field, condition):
+                rows = postings.get(value)
+                if rows is not None:
+                    field_mask[rows] = True
+            mask &= field_mask
+        return mask
+
+
+class FilterSelector:
+    """A resolved filter for one segment: row count plus the FAISS selector"""
+
+    def __init__(self, mask: np.ndarray):
+        self.mask = mask
+        self.count = int(mask.sum())
+        # The packed bitmap must outlive the selector that points into it
+        self.bitmap = np.packbits(mask, bitorder='little')
+        self.selector = faiss.IDSelectorBitmap(self.bitmap)
+
+
+def resolve_filter(
+    metadata_index: MetadataIndex,
+    filter_spec: Dict[str, Any],
+    live_ids: Optional[np.ndarray] = None
+) -> FilterSelector:
+    """Combine a metadata filter with a segment's tombstones into one selector"""
+    mask = metadata_index.mask(filter_spec)
+    if live_ids is not None:
+        live = np.zeros(metadata_index.rows, dtype=bool)
+        live[live_ids] = True
+        mask &= live
+    return FilterSelector(mask)
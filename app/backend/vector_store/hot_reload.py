@@ -0,0 +1,102 @@
+import threading
+from pathlib import Path
+from typing import List, Any, Callable, Optional
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun
+)
+from pydantic import ConfigDict
+
+from app.backend.vector_store.segment_store import SegmentStore
+
+DEFAULT_POLL_INTERVAL = 5.0
+
+
+class ReloadingRetriever(BaseRetriever):
+    """Retriever that follows the vectorstore's published snapshot.
+
+    A daemon thread polls the CURRENT pointer; when it moves, the new snapshot is
+    loaded in the background and the wrapped retriever reference is swapped in one
+    assignment. Each query reads the reference once, so in-flight queries finish
+    on the version they started with.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    def __init__(
+        self,
+        loader: Callable[[], Any],
+        persist_path: str,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        watch: bool = True
+    ):
+        super().__init__()
+        object.__setattr__(self, 'loader', loader)
+        object.__setattr__(self, 'store', SegmentStore(Path(persist_path)))
+        object.__setattr__(self, 'poll_interval', poll_interval)
+        object.__setattr__(self, 'retriever', loader())
+        object.__setattr__(self, '_reload_lock', threading.Lock())
+        object.__setattr__(self, '_stop', threading.Event())
+        object.__setattr__(self, '_thread', None)
+        if watch:
+            self.start()
+
+    @property
+    def snapshot(self) -> Optional[str]:
+        return self.retriever.metadata.get('snapshot')
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        thread = threading.Thread(target=self._watch, name="vectorstore-watcher", daemon=True)
+        object.__setattr__(self, '_thread', thread)
+        thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self.reload_if_changed()
+
+    def reload_if_changed(self) -> bool:
+        """Load and swap in the published snapshot if it differs from the served one"""
+        with self._reload_lock:
+            current = self.store.current_snapshot()
+            if current is None or current == self.snapshot:
+                return False
+            print(f"🐞 [ReloadingRetriever] Snapshot {self.snapshot} -> {current}, loading...")
+            try:
+                retriever = self.loader()
+            except Exception as e:
+                # Keep serving the old version; the next poll retries
+                print(f"❌ [ReloadingRetriever] Reload failed: {str(e)}")
+                return False
+            object.__setattr__(self, 'retriever', retriever)
+        print(f"✅ [ReloadingRetriever] Now serving snapshot {self.snapshot}")
+        return True
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun = None,
+        **kwargs: Any
+    ) -> List[Document]:
+        retriever = self.retriever
+        return retriever._get_relevant_documents(query, run_manager=run_manager, **kwargs)
+
+    async def _aget_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: AsyncCallbackManagerForRetrieverRun = None,
+        **kwargs: Any
+    ) -> List[Document]:
+        retriever = self.retriever
+        return await retriever._aget_relevant_documents(query, run_manager=run_manager, **kwargs)
+
+    def batch_get_relevant_documents(self, queries: List[str], **kwargs: Any) -> List[List[Document]]:
+        return self.retriever.batch_get_relevant_documents(queries, **kwargs)
@@ -0,0 +1,169 @@
+import math
+from typing import Dict, Any, Optional
+import numpy as np
+import faiss
+
+from app.backend.vector_store.numpy_index import NumpyIndex
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw", "sq8", "pq")
+
+# Search backends: FAISS indexes, or exact NumPy matrix search over the stored vectors
+BACKENDS = ("faiss", "numpy")
+
+# Types built on inverted lists (pq is a single-list IVF-PQ)
+IVF_TYPES = ("ivf_flat", "ivf_pq", "pq")
+
+# Types that store lossy codes; their hits are re-ranked against float16 vectors
+COMPRESSED_TYPES = ("sq8", "pq", "ivf_pq")
+
+# "ip" is cosine similarity on L2-normalized vectors (higher is better),
+# "l2" is squared euclidean distance (lower is better)
+METRICS = {"l2": faiss.METRIC_L2, "ip": faiss.METRIC_INNER_PRODUCT}
+
+# Automatic selection by chunk count
+FLAT_MAX_CHUNKS = 5_000
+HNSW_MAX_CHUNKS = 100_000
+IVF_FLAT_MAX_CHUNKS = 1_000_000
+
+# Below these sizes the index cannot be trained meaningfully
+MIN_TRAIN_POINTS = {"ivf_flat": 1_000, "ivf_pq": 10_000, "pq": 10_000}
+
+DEFAULT_HNSW_M = 32
+DEFAULT_EF_CONSTRUCTION = 80
+DEFAULT_EF_SEARCH = 64
+DEFAULT_NPROBE = 16
+
+
+def select_index_type(n_vectors: int) -> str:
+    """Pick an index type for a corpus of n_vectors chunks"""
+    if n_vectors < FLAT_MAX_CHUNKS:
+        return "flat"
+    if n_vectors < HNSW_MAX_CHUNKS:
+        return "hnsw"
+    if n_vectors < IVF_FLAT_MAX_CHUNKS:
+        return "ivf_flat"
+    return "ivf_pq"
+
+
+def default_nlist(n_vectors: int) -> int:
+    """Number of IVF lists, ~4*sqrt(n) while keeping >= 39 training points per list"""
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+
+
+def _pq_subquantizers(dimension: int) -> int:
+    """Largest sub-quantizer count <= d/8 that divides the dimension"""
+    m = max(1, dimension // 8)
+    while dimension % m:
+        m -= 1
+    return m
+
+
+def create_index(
+    vectors: np.ndarray,
+    index_type: str = "auto",
+    index_params: Optional[Dict[str, Any]] = None,
+    metric: str = "l2"
+):
+    """Build, train and fill a FAISS index. Returns (index, resolved index_type)."""
+    params = index_params or {}
+    n_vectors, dimension = vectors.shape
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric '{metric}'. Must be one of: {tuple(METRICS)}")
+    metric_type = METRICS[metric]
+    if index_type == "auto":
+        index_type = select_index_type(n_vectors)
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Must be one of: {INDEX_TYPES}")
+    if n_vectors < MIN_TRAIN_POINTS.get(index_type, 0):
+        print(f"⚠️ [index_factory] {n_vectors} vectors are too few to train {index_type}, using flat")
+        index_type = "flat"
+
+    if index_type == "flat":
+        index = faiss.IndexFlat(dimension, metric_type)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, params.get("hnsw_m", DEFAULT_HNSW_M), metric_type)
+        index.hnsw.efConstruction = params.get("ef_construction", DEFAULT_EF_CONSTRUCTION)
+    elif index_type == "sq8":
+        index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, metric_type)
+        index.train(vectors)
+    elif index_type == "pq":
+        # A single inverted list is an exhaustive PQ scan that, unlike IndexPQ,
+        # accepts search parameters (and therefore tombstone selectors)
+        m = params.get("pq_m") or _pq_subquantizers(dimension)
+        index = faiss.index_factory(dimension, f"IVF1,PQ{m}", metric_type)
+        index.train(vectors)
+    else:
+        nlist = params.get("nlist") or default_nlist(n_vectors)
+        if index_type == "ivf_flat":
+            description = f"IVF{nlist},Flat"
+        else:
+            description = f"IVF{nlist},PQ{params.get('pq_m') or _pq_subquantizers(dimension)}"
+        index = faiss.index_factory(dimension, description, metric_type)
+        index.train(vectors)
+
+    index.add(vectors)
+    return index, index_type
+
+
+def read_index(path: str, mmap: bool = False, index_type: Optional[str] = None) -> Any:
+    """Read a FAISS index; with mmap the vectors/codes stay in the shared page cache.
+
+    A memory-mapped index is read-only and backed by the file, so every worker
+    process that maps the same segment shares one physical copy. index_type
+    (from the segment catalog) selects the mapping flag; without it the index
+    is treated as non-IVF.
+    """
+    if not mmap:
+        return faiss.read_index(str(path))
+    if index_type in IVF_TYPES:
+        # IO_FLAG_MMAP maps the inverted lists (OnDiskInvertedLists); IO_FLAG_MMAP_IFC
+        # would load them onto the heap as ArrayInvertedLists
+        flags = faiss.IO_FLAG_MMAP
+    else:
+        # IO_FLAG_MMAP_IFC maps the code arrays of flat, HNSW and SQ indexes
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+    return faiss.read_index(str(path), flags | faiss.IO_FLAG_READ_ONLY)
+
+
+def metric_of(index: Any) -> str:
+    """Metric name of a loaded FAISS index"""
+    return "ip" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+
+
+def index_type_of(index: Any) -> str:
+    """Recover the index type of a loaded FAISS index"""
+    if isinstance(index, NumpyIndex):
+        return "numpy"
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf = faiss.downcast_index(ivf)
+        if isinstance(ivf, faiss.IndexIVFPQ):
+            return "pq" if ivf.nlist == 1 else "ivf_pq"
+        return "ivf_flat"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "sq8"
+    return "flat"
+
+
+def search_parameters(
+    index: Any,
+    search_kwargs: Dict[str, Any],
+    selector: Optional[Any] = None
+) -> Optional[Any]:
+    """Search-time knobs (nprobe / ef_search) and an optional ID selector for one index"""
+    index_type = index_type_of(index)
+    if index_type in ("ivf_flat", "ivf_pq", "pq"):
+        return faiss.SearchParametersIVF(
+            sel=selector,
+            nprobe=search_kwargs.get("nprobe", DEFAULT_NPROBE)
+        )
+    if index_type == "hnsw":
+        return faiss.SearchParametersHNSW(
+            sel=selector,
+            efSearch=max(search_kwargs.get("ef_search", DEFAULT_EF_SEARCH), search_kwargs.get("k", 3))
+        )
+    if selector is not None:
+        return faiss.SearchParameters(sel=selector)
+    return None
@@ -0,0 +1,193 @@
+import json
+import re
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+TERMS_FILE = "terms.json"
+
+# BM25 defaults (Robertson/Sparck Jones)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Words with internal hyphens, dots or slashes kept whole, so "I-9" and "4.2" stay searchable
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-./][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms of a chunk or query"""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class LexicalIndex:
+    """BM25 postings of one segment in CSR form.
+
+    terms[i] owns rows[indptr[i]:indptr[i+1]] with term frequencies tf[...];
+    lengths holds the token count of every row. Arrays are memory-mapped when
+    the index is read from disk.
+    """
+
+    def __init__(
+        self,
+        terms: List[str],
+        indptr: np.ndarray,
+        rows: np.ndarray,
+        tf: np.ndarray,
+        lengths: np.ndarray
+    ):
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.indptr = indptr
+        self.rows = rows
+        self.tf = tf
+        self.lengths = lengths
+
+    @classmethod
+    def from_texts(cls, texts: List[str]) -> "LexicalIndex":
+        """Build postings for a list of chunk texts"""
+        row_ids, term_ids, lengths = [], [], np.zeros(len(texts), dtype='int32')
+        vocab: Dict[str, int] = {}
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[row] = len(tokens)
+            term_ids.extend(vocab.setdefault(token, len(vocab)) for token in tokens)
+            row_ids.extend([row] * len(tokens))
+        # Sort terms alphabetically so the on-disk vocabulary is deterministic
+        terms = sorted(vocab)
+        remap = np.empty(len(vocab), dtype='int64')
+        remap[[vocab[t] for t in terms]] = np.arange(len(terms))
+        pairs = np.stack([
+            remap[np.array(term_ids, dtype='int64')],
+            np.array(row_ids, dtype='int64')
+        ], axis=1).reshape(-1, 2)
+        # (term, row) pairs sorted by term then row; the count of each pair is its tf
+        pairs, counts = np.unique(pairs, axis=0, return_counts=True)
+        indptr = np.zeros(len(terms) + 1, dtype='int64')
+        np.add.at(indptr, pairs[:, 0] + 1, 1)
+        return cls(
+            terms,
+            np.cumsum(indptr),
+            pairs[:, 1].astype('int32'),
+            counts.astype('float32'),
+            lengths
+        )
+
+    @classmethod
+    def read(cls, path: Path) -> "LexicalIndex":
+        path = Path(path)
+        with open(path / TERMS_FILE, "r", encoding="utf-8") as f:
+            terms = json.load(f)
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode='r')
+                  for name in ("indptr", "rows", "tf", "lengths")}
+        return cls(terms, **arrays)
+
+    def write(self, path: Path) -> None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        with open(path / TERMS_FILE, "w", encoding="utf-8") as f:
+            json.dump(sorted(self.term_ids, key=self.term_ids.get), f)
+        for name in ("indptr", "rows", "tf", "lengths"):
+            np.save(path / f"{name}.npy", getattr(self, name))
+
+    def postings(self, term: str):
+        """(rows, term frequencies) of a term; empty arrays when it never occurs"""
+        i = self.term_ids.get(term)
+        if i is None:
+            return self.rows[:0], self.tf[:0]
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.rows[start:end], self.tf[start:end]
+
+
+def write_lexical_index(path: Path, texts: List[str]) -> None:
+    """Build and persist the BM25 postings of a segment"""
+    LexicalIndex.from_texts(texts).write(path)
+
+
+class BM25:
+    """BM25 over several segments with corpus-wide statistics.
+
+    Only live rows count toward N, document frequencies and the average length,
+    so tombstoned chunks neither match nor skew idf. Scoring touches only the
+    postings of the query terms.
+    """
+
+    def __init__(
+        self,
+        indexes: List[LexicalIndex],
+        live_masks: List[Optional[np.ndarray]],
+        k1: float = BM25_K1,
+        b: float = BM25_B
+    ):
+        self.indexes = indexes
+        self.live_masks = live_masks
+        self.k1 = k1
+        self.b = b
+        self.n_docs = 0
+        total_length = 0
+        for index, live in zip(indexes, live_masks):
+            lengths = index.lengths if live is None else index.lengths[live]
+            self.n_docs += len(lengths)
+            total_length += int(np.sum(lengths))
+        self.avg_length = total_length / self.n_docs if self.n_docs else 1.0
+
+    def _document_frequency(self, term: str) -> int:
+        df = 0
+        for index, live in zip(self.indexes, self.live_masks):
+            rows, _ = index.postings(term)
+            df += len(rows) if live is None else int(live[rows].sum())
+        return df
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        masks: Optional[List[Optional[np.ndarray]]] = None
+    ) -> List[tuple]:
+        """Top-k (score, segment position, row) hits with a positive score.
+
+        masks optionally restricts each segment to the rows set in a boolean mask
+        (e.g. a resolved metadata filter); otherwise the live rows are used.
+        """
+        terms = set(tokenize(query))
+        idf = {}
+        for term in terms:
+            df = self._document_frequency(term)
+            if df:
+                idf[term] = np.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5))
+        if not idf:
+            return []
+
+        hits = []
+        for position, index in enumerate(self.indexes):
+            allowed = masks[position] if masks is not None else self.live_masks[position]
+            row_blocks, score_blocks = [], []
+            for term, weight in idf.items():
+                rows, tf = index.postings(term)
+                if not len(rows):
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * index.lengths[rows] / self.avg_length)
+                row_blocks.append(rows)
+                score_blocks.append(weight * tf * (self.k1 + 1) / (tf + norm))
+            if not row_blocks:
+                continue
+            rows = np.concatenate(row_blocks)
+            # Sum the contributions of every query term per row
+            candidates, inverse = np.unique(rows, return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(score_blocks))
+            if allowed is not None:
+                keep = allowed[candidates]
+                candidates, scores = candidates[keep], scores[keep]
+            if len(scores) > k:
+                top = np.argpartition(-scores, k)[:k]
+                candidates, scores = candidates[top], scores[top]
+            hits.extend(zip(scores.tolist(), [position] * len(scores), candidates.tolist()))
+        hits.sort(key=lambda hit: -hit[0])
+        return hits[:k]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Any]], rrf_k: int = 60) -> List[tuple]:
+    """Fuse ranked lists of hashable keys: score(key) = sum 1 / (rrf_k + rank)"""
+    fused: Dict[Any, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
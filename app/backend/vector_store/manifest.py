@@ -0,0 +1,61 @@
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+MANIFEST_FILE = "manifest.json"
+_HASH_BLOCK = 1024 * 1024
+
+
+def file_checksum(path: Path) -> str:
+    """sha256 of a file, or of the relative paths and contents of a directory's files"""
+    digest = hashlib.sha256()
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    for file in files:
+        if path.is_dir():
+            digest.update(str(file.relative_to(path)).encode("utf-8"))
+        with open(file, "rb") as f:
+            for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def disk_size(path: Path) -> int:
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    return path.stat().st_size
+
+
+def build_manifest(
+    catalog: Dict[str, Any],
+    snapshot: str,
+    documents: Dict[str, int],
+    embedder: Optional[str] = None
+) -> Dict[str, Any]:
+    """Summary of a published snapshot; everything a health check or stats view needs"""
+    index_types: Dict[str, int] = {}
+    for seg in catalog["segments"]:
+        index_types[seg["index_type"]] = index_types.get(seg["index_type"], 0) + 1
+    return {
+        "snapshot": snapshot,
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+        "embedder": embedder,
+        "dimension": catalog.get("dimension"),
+        "metric": catalog.get("metric", "l2"),
+        "vectors": sum(documents.values()),
+        "rows": sum(seg["rows"] for seg in catalog["segments"]),
+        "index_types": index_types,
+        "documents": documents,
+        "segments": {seg["name"]: seg.get("files", {}) for seg in catalog["segments"]},
+    }
+
+
+def load_manifest(persist_path: str) -> Optional[Dict[str, Any]]:
+    """Read the manifest of a vectorstore, if any"""
+    path = Path(persist_path) / MANIFEST_FILE
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
@@ -0,0 +1,42 @@
+from typing import List
+import numpy as np
+
+DEFAULT_LAMBDA_MULT = 0.5
+DEFAULT_FETCH_K = 20
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def maximal_marginal_relevance(
+    query: np.ndarray,
+    candidates: np.ndarray,
+    k: int,
+    lambda_mult: float = DEFAULT_LAMBDA_MULT
+) -> List[int]:
+    """Positions of k candidates chosen by MMR, in selection order.
+
+    Relevance and redundancy are cosine similarities. The candidate x candidate
+    similarity matrix is computed once; each greedy step only updates the running
+    maximum similarity to the already selected set.
+    """
+    if len(candidates) == 0 or k <= 0:
+        return []
+    candidates = _normalize(np.asarray(candidates, dtype='float32'))
+    relevance = candidates @ _normalize(np.asarray(query, dtype='float32'))
+    similarity = candidates @ candidates.T
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarity[selected[0]].copy()
+    available = np.ones(len(candidates), dtype=bool)
+    available[selected[0]] = False
+    while len(selected) < min(k, len(candidates)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    return selected
@@ -0,0 +1,83 @@
+from pathlib import Path
+from typing import Optional
+import numpy as np
+import faiss
+
+# Rows scored per matrix product, bounds the float32 temporary for float16 matrices
+SCORE_BLOCK_ROWS = 65_536
+
+
+class NumpyIndex:
+    """Exact search over a contiguous (ntotal, d) float16/float32 matrix.
+
+    A drop-in for the parts of the FAISS index API the retriever uses (ntotal, d,
+    metric_type, search, reconstruct_batch). Scoring is one matrix product per
+    block plus argpartition, so small and medium corpora need no FAISS index at
+    all; a memory-mapped matrix is shared between processes through the page cache.
+    """
+
+    def __init__(self, vectors: np.ndarray, metric: str = "l2"):
+        self.vectors = vectors
+        self.ntotal, self.d = vectors.shape
+        self.metric = metric
+        self.metric_type = faiss.METRIC_INNER_PRODUCT if metric == "ip" else faiss.METRIC_L2
+        self.norms = None
+        if metric == "l2":
+            self.norms = np.concatenate([
+                (np.asarray(vectors[start:start + SCORE_BLOCK_ROWS], dtype='float32') ** 2).sum(axis=1)
+                for start in range(0, self.ntotal, SCORE_BLOCK_ROWS)
+            ]) if self.ntotal else np.zeros(0, dtype='float32')
+
+    @classmethod
+    def load(cls, path: Path, metric: str = "l2", mmap: bool = True) -> "NumpyIndex":
+        return cls(np.load(path, mmap_mode='r' if mmap else None), metric)
+
+    @classmethod
+    def from_faiss(cls, index, dtype: str = 'float16') -> "NumpyIndex":
+        """Copy the vectors out of a FAISS index that supports reconstruction"""
+        metric = "ip" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+        return cls(index.reconstruct_n(0, index.ntotal).astype(dtype), metric)
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """(n, ntotal) scores in FAISS units: inner product, or squared L2 distance"""
+        blocks = []
+        for start in range(0, self.ntotal, SCORE_BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + SCORE_BLOCK_ROWS], dtype='float32')
+            blocks.append(queries @ block.T)
+        scores = np.concatenate(blocks, axis=1) if blocks else np.zeros((len(queries), 0), dtype='float32')
+        if self.metric == "ip":
+            return scores
+        return (queries ** 2).sum(axis=1)[:, None] + self.norms[None, :] - 2 * scores
+
+    def search(self, queries: np.ndarray, k: int, mask: Optional[np.ndarray] = None):
+        """Top-k (distances, indices) per query; mask restricts the searchable rows.
+
+        Slots beyond the number of searchable rows are returned as index -1.
+        """
+        queries = np.ascontiguousarray(queries, dtype='float32')
+        n = len(queries)
+        scores = self._scores(queries)
+        # Rank by "smaller is better" for both metrics
+        keys = -scores if self.metric == "ip" else scores
+        if mask is not None:
+            keys = np.where(mask[None, :], keys, np.inf)
+        available = self.ntotal if mask is None else int(mask.sum())
+        k_found = min(k, available)
+
+        distances = np.full((n, k), -np.inf if self.metric == "ip" else np.inf, dtype='float32')
+        indices = np.full((n, k), -1, dtype='int64')
+        if k_found == 0:
+            return distances, indices
+        top = np.argpartition(keys, k_found - 1, axis=1)[:, :k_found]
+        order = np.argsort(np.take_along_axis(keys, top, axis=1), axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        distances[:, :k_found] = np.take_along_axis(scores, top, axis=1)
+        indices[:, :k_found] = top
+        return distances, indices
+
+    def reconstruct_batch(self, rows: np.ndarray) -> np.ndarray:
+        return np.asarray(self.vectors[np.asarray(rows, dtype='int64')], dtype='float32')
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Hashable
+
+DEFAULT_TTL_SECONDS = 600.0
+DEFAULT_EMBEDDING_ENTRIES = 1024
+DEFAULT_RESULT_ENTRIES = 4096
+
+
+def normalize_query(query: str) -> str:
+    """Cache key form of a question: surrounding and repeated whitespace removed"""
+    return " ".join(query.split())
+
+
+class TTLCache:
+    """Thread-safe LRU with a per-entry time to live and hit/miss counters"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # Computed outside the lock; two threads may race on the same key, which is harmless
+        value = compute()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class QueryCache:
+    """Query text -> embedding, and (embedding, k, filter, options, version) -> hits.
+
+    The embedding cache survives index reloads; result entries carry the
+    vectorstore snapshot id in their key and are dropped when the snapshot changes.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        embedding_entries: int = DEFAULT_EMBEDDING_ENTRIES,
+        result_entries: int = DEFAULT_RESULT_ENTRIES
+    ):
+        self.embeddings = TTLCache(embedding_entries, ttl)
+        self.results = TTLCache(result_entries, ttl)
+        self.version = None
+
+    def embedding(self, query: str, embed: Callable[[str], Any]) -> Any:
+        return self.embeddings.get_or_compute(normalize_query(query), lambda: embed(query))
+
+    def result(self, key: Hashable, search: Callable[[], Any]) -> Any:
+        return self.results.get_or_compute(key, search)
+
+    @staticmethod
+    def result_key(
+        embedding: Any,
+        k: int,
+        filter_spec: Any,
+        search_kwargs: Dict[str, Any],
+        version: str,
+        query: str = ""
+    ) -> tuple:
+        options = json.dumps({**search_kwargs, 'filter': filter_spec, 'k': k}, sort_keys=True, default=str)
+        return (hashlib.sha1(embedding.tobytes()).hexdigest(), normalize_query(query), options, version)
+
+    def set_version(self, version: str) -> None:
+        """Record the snapshot being served; cached results of any other snapshot are dropped"""
+        if version != self.version:
+            self.results.clear()
+            self.version = version
+
+    def stats(self) -> Dict[str, Any]:
+        return {"version": self.version, "embeddings": self.embeddings.stats(), "results": self.results.stats()}
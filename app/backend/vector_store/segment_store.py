@@ -0,0 +1,824 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import numpy as np
+import faiss
+from langchain_core.documents import Document
+
+from app.backend.vector_store.chunk_store import ChunkStore, write_chunk_store
+from app.backend.vector_store.filters import MetadataIndex
+from app.backend.vector_store.lexical import LexicalIndex, write_lexical_index
+from app.backend.vector_store.manifest import (
+    build_manifest, disk_size, file_checksum, load_manifest, MANIFEST_FILE
+)
+from app.backend.vector_store.index_factory import (
+    create_index, index_type_of, metric_of, read_index, search_parameters,
+    BACKENDS, METRICS, COMPRESSED_TYPES
+)
+from app.backend.vector_store.numpy_index import NumpyIndex
+
+CATALOG_FILE = "segments.json"
+SEGMENTS_DIR = "segments"
+SNAPSHOTS_DIR = "snapshots"
+CURRENT_FILE = "CURRENT"
+
+# Published snapshots kept loadable (the current one is always kept)
+SNAPSHOT_RETENTION = 3
+
+# Compaction policy
+SMALL_SEGMENT_ROWS = 2000     # segments below this size are merge candidates
+COMPACTION_TRIGGER = 4        # number of small segments that triggers a merge
+MAX_DEAD_RATIO = 0.5          # segments with more tombstoned rows get rewritten
+
+# Key prefix of document versions still being written; never published
+STAGING_PREFIX = "~staging:"
+# Key prefix of canonical chunks shared by several documents
+SHARED_PREFIX = "~shared:"
+
+_STORE_LOCKS: Dict[str, threading.RLock] = {}
+_PENDING: Dict[str, set] = {}
+_COMPACTING: set = set()
+_REGISTRY_LOCK = threading.Lock()
+
+PREFAULT_BLOCK = 8 * 1024 * 1024
+
+
+def _store_state(path: Path):
+    """Writer lock and in-flight segment names shared by all SegmentStores on one directory"""
+    key = str(path.absolute())
+    with _REGISTRY_LOCK:
+        if key not in _STORE_LOCKS:
+            _STORE_LOCKS[key] = threading.RLock()
+            _PENDING[key] = set()
+        return _STORE_LOCKS[key], _PENDING[key]
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    """Write a small file so readers see either the old or the new content"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def prefault(paths: List[Path]) -> int:
+    """Read files once so their pages are resident in the page cache; returns bytes read"""
+    total = 0
+    buffer = bytearray(PREFAULT_BLOCK)
+    for path in paths:
+        files = path.rglob("*") if path.is_dir() else [path]
+        for file in files:
+            if not file.is_file():
+                continue
+            with open(file, "rb", buffering=0) as f:
+                while True:
+                    read = f.readinto(buffer)
+                    if not read:
+                        break
+                    total += read
+    return total
+
+
+def document_key(doc: Document) -> str:
+    """Segment key of a chunk: the source PDF it was split from"""
+    return doc.metadata.get('filename') or doc.metadata.get('doc_id', 'unknown')
+
+
+def staging_key(doc_key: str) -> str:
+    """Key a new version of doc_key is written under until commit_staged()"""
+    return f"{STAGING_PREFIX}{doc_key}"
+
+
+def shared_key(text: str) -> str:
+    """Key a canonical chunk shared by several documents is stored under"""
+    return f"{SHARED_PREFIX}{hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]}"
+
+
+def shared_citations(catalog: Dict[str, Any], key: str) -> List[Dict[str, Any]]:
+    """Current citations of a shared chunk: every live document that contains it"""
+    refs = catalog.get("shared", {}).get(key, {})
+    return [citation for doc_key in sorted(refs) for citation in refs[doc_key]]
+
+
+def hide_staged(catalog: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a catalog with staged documents tombstoned, as readers should see it"""
+    visible = json.loads(json.dumps(catalog))
+    segments = []
+    for seg in visible["segments"]:
+        seg["dead"].extend(key for key in seg["docs"]
+                           if key.startswith(STAGING_PREFIX) and key not in seg["dead"])
+        if SegmentStore._dead_rows(seg) < seg["rows"]:
+            segments.append(seg)
+    visible["segments"] = segments
+    return visible
+
+
+class Segment:
+    """An immutable on-disk segment loaded for searching"""
+
+    def __init__(
+        self,
+        name: str,
+        index: Any,
+        chunks: Any,  # ChunkStore, or a Document list for legacy stores
+        live_ids: Optional[np.ndarray] = None,
+        side_vectors: Optional[np.ndarray] = None,
+        lexical: Optional[LexicalIndex] = None
+    ):
+        self.name = name
+        self.index = index
+        self.chunks = chunks
+        # None means every row is live; otherwise only these row ids are searchable
+        self.live_ids = live_ids
+        self.selector = faiss.IDSelectorBatch(live_ids) if live_ids is not None else None
+        self.index_type = index_type_of(index)
+        self.metric = metric_of(index)
+        # Memory-mapped float16 copy of the vectors for exact re-ranking of compressed hits
+        self.side_vectors = side_vectors
+        # Inverted metadata index for filtered search; postings are built on first use
+        self.metadata_index = MetadataIndex(chunks)
+        self._lexical = lexical
+        self._live_mask = None
+
+    @property
+    def lexical(self) -> LexicalIndex:
+        """BM25 postings; built in memory for segments written before they were persisted"""
+        if self._lexical is None:
+            self._lexical = LexicalIndex.from_texts([doc.page_content for doc in self.chunks])
+        return self._lexical
+
+    @property
+    def live_mask(self) -> Optional[np.ndarray]:
+        """Boolean mask of live rows, or None when every row is live"""
+        if self.live_ids is None:
+            return None
+        if self._live_mask is None:
+            mask = np.zeros(self.index.ntotal, dtype=bool)
+            mask[self.live_ids] = True
+            self._live_mask = mask
+        return self._live_mask
+
+    @property
+    def compressed(self) -> bool:
+        return self.index_type in COMPRESSED_TYPES
+
+    @property
+    def live_count(self) -> int:
+        return self.index.ntotal if self.live_ids is None else len(self.live_ids)
+
+    def reconstruct(self, rows: np.ndarray) -> np.ndarray:
+        """float32 vectors of the given rows, from the float16 copy or the index itself"""
+        rows = np.asarray(rows, dtype='int64')
+        if isinstance(self.index, NumpyIndex):
+            return self.index.reconstruct_batch(rows)
+        if self.side_vectors is not None:
+            return np.asarray(self.side_vectors[rows], dtype='float32')
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+            with _REGISTRY_LOCK:
+                # IVF indexes need a row -> list position map before they can reconstruct
+                if ivf.direct_map.type == faiss.DirectMap.NoMap:
+                    ivf.make_direct_map()
+        return self.index.reconstruct_batch(rows)
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        search_kwargs: Dict[str, Any],
+        resolved: Optional[Any] = None
+    ):
+        """(distances, indices) of the k best live rows, optionally within a resolved filter"""
+        if isinstance(self.index, NumpyIndex):
+            return self.index.search(queries, k, resolved.mask if resolved is not None else self.live_mask)
+        selector = resolved.selector if resolved is not None else None
+        return self.index.search(queries, k, params=self.search_params(search_kwargs, selector))
+
+    def search_params(self, search_kwargs: Dict[str, Any], selector: Optional[Any] = None) -> Optional[Any]:
+        """Search knobs for this segment's index; tombstoned (or filtered-out) rows are
+        hidden inside the search. A filter selector already accounts for tombstones."""
+        return search_parameters(self.index, search_kwargs, selector or self.selector)
+
+
+class SegmentStore:
+    """Append-only segment storage for one domain vectorstore.
+
+    Every upsert writes a new segment holding the chunks of a single document and
+    tombstones that document in older segments. Small or mostly dead segments are
+    merged by a background compaction. The catalog (segments.json) is the only
+    mutable file and is replaced atomically.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        index_type: str = "auto",
+        index_params: Optional[Dict[str, Any]] = None,
+        metric: Optional[str] = None
+    ):
+        if metric is not None and metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}'. Must be one of: {tuple(METRICS)}")
+        self.path = Path(path)
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        # None keeps whatever metric the store was created with
+        self.metric = metric
+        self.segments_dir = self.path / SEGMENTS_DIR
+        self.catalog_path = self.path / CATALOG_FILE
+        self._lock, self._pending = _store_state(self.path)
+
+    def exists(self) -> bool:
+        return self.catalog_path.exists()
+
+    # ---- catalog -------------------------------------------------------
+
+    def read_catalog(self) -> Dict[str, Any]:
+        if not self.catalog_path.exists():
+            return {"next_id": 1, "segments": []}
+        with open(self.catalog_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_catalog(self, catalog: Dict[str, Any], changed: bool = True) -> None:
+        """changed=False for rewrites that keep the live content, i.e. compaction"""
+        if changed:
+            # Snapshots copy the counter, so unpublished writes can be detected
+            catalog["writes"] = catalog.get("writes", 0) + 1
+        _atomic_write(self.catalog_path, json.dumps(catalog, indent=2))
+
+    # ---- snapshots -----------------------------------------------------
+
+    @property
+    def snapshots_dir(self) -> Path:
+        return self.path / SNAPSHOTS_DIR
+
+    def publish(self, embedder: Optional[str] = None) -> str:
+        """Freeze the current catalog as a content-addressed snapshot and point CURRENT at it.
+
+        Segments are immutable, so a snapshot is just a copy of the catalog. Readers
+        load whatever CURRENT names and never see a half-finished build. The manifest
+        (counts, dimension, embedder, checksums) is rewritten for the new snapshot;
+        embedder=None keeps the name recorded by the previous build. Staged
+        documents are left out until they are committed.
+        """
+        with self._lock:
+            catalog = hide_staged(self.read_catalog())
+            body = json.dumps(catalog, sort_keys=True, indent=2)
+            snapshot_id = hashlib.sha256(body.encode("utf-8")).hexdigest()[:16]
+            self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+            snapshot_path = self.snapshots_dir / f"{snapshot_id}.json"
+            if snapshot_path.exists():
+                # Republishing an identical catalog only refreshes its age
+                os.utime(snapshot_path)
+            else:
+                _atomic_write(snapshot_path, body)
+            if embedder is None:
+                embedder = (load_manifest(self.path) or {}).get("embedder")
+            manifest = build_manifest(catalog, snapshot_id, self.documents(catalog), embedder)
+            _atomic_write(self.path / MANIFEST_FILE, json.dumps(manifest, indent=2))
+            _atomic_write(self.path / CURRENT_FILE, snapshot_id)
+            self._prune_snapshots(snapshot_id)
+        self.collect_garbage()
+        print(f"🐞 [SegmentStore] Published snapshot {snapshot_id}")
+        return snapshot_id
+
+    def current_snapshot(self) -> Optional[str]:
+        """Id of the published snapshot, or None if nothing was published yet"""
+        try:
+            return (self.path / CURRENT_FILE).read_text(encoding="utf-8").strip() or None
+        except FileNotFoundError:
+            return None
+
+    def read_snapshot(self, snapshot_id: str) -> Dict[str, Any]:
+        with open(self.snapshots_dir / f"{snapshot_id}.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def verify(self, deep: bool = False) -> List[str]:
+        """Check the store against its manifest without loading any index.
+
+        The quick check compares the snapshot pointer and file sizes; deep=True also
+        recomputes every checksum. Returns the problems found (empty when healthy).
+        """
+        manifest = load_manifest(self.path)
+        if manifest is None:
+            return [f"No {MANIFEST_FILE} in {self.path}"]
+        problems = []
+        current = self.current_snapshot()
+        if current != manifest["snapshot"]:
+            problems.append(f"Manifest describes snapshot {manifest['snapshot']} but CURRENT is {current}")
+        for name, files in manifest["segments"].items():
+            for suffix, expected in files.items():
+                path = self._segment_file(name, suffix)
+                if not path.exists():
+                    problems.append(f"Missing {path.name}")
+                elif disk_size(path) != expected["bytes"]:
+                    problems.append(f"Size mismatch for {path.name}")
+                elif deep and file_checksum(path) != expected["sha256"]:
+                    problems.append(f"Checksum mismatch for {path.name}")
+        return problems
+
+    def _retained_snapshots(self) -> List[Path]:
+        if not self.snapshots_dir.exists():
+            return []
+        snapshots = sorted(self.snapshots_dir.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+        return snapshots[:SNAPSHOT_RETENTION]
+
+    def _prune_snapshots(self, current: str) -> None:
+        keep = {p.name for p in self._retained_snapshots()} | {f"{current}.json"}
+        for path in self.snapshots_dir.glob("*.json"):
+            if path.name not in keep:
+                path.unlink(missing_ok=True)
+
+    def _resolve_metric(self, catalog: Dict[str, Any]) -> str:
+        """Metric for new segments; every segment of a store must share one metric"""
+        current = catalog.get("metric", "l2")
+        if not catalog["segments"]:
+            catalog["metric"] = self.metric or current
+        elif self.metric and self.metric != current:
+            raise ValueError(
+                f"Vectorstore at {self.path} uses metric '{current}'; "
+                f"delete and rebuild it to switch to '{self.metric}'"
+            )
+        else:
+            catalog["metric"] = current
+        return catalog["metric"]
+
+    def documents(self, catalog: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """Live chunk count per document key; a shared chunk counts for every document containing it"""
+        catalog = catalog or self.read_catalog()
+        counts: Dict[str, int] = {}
+        for seg in catalog["segments"]:
+            for key, (start, end) in seg["docs"].items():
+                if key not in seg["dead"] and not key.startswith((STAGING_PREFIX, SHARED_PREFIX)):
+                    counts[key] = counts.get(key, 0) + (end - start)
+        for refs in catalog.get("shared", {}).values():
+            for key in refs:
+                counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    # ---- segment files -------------------------------------------------
+
+    def _segment_file(self, name: str, suffix: str) -> Path:
+        return self.segments_dir / f"{name}{suffix}"
+
+    def _write_segment(
+        self,
+        name: str,
+        documents: List[Document],
+        vectors: np.ndarray,
+        metric: str
+    ) -> str:
+        """Write the segment files and return the index type that was built"""
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+        if metric == "ip":
+            # Inner product on unit vectors is cosine similarity
+            faiss.normalize_L2(vectors)
+        index, index_type = create_index(vectors, self.index_type, self.index_params, metric)
+        faiss.write_index(index, str(self._segment_file(name, ".faiss")))
+        # Raw vectors are kept so compaction never has to re-embed
+        np.save(self._segment_file(name, ".npy"), vectors)
+        if index_type in COMPRESSED_TYPES:
+            np.save(self._segment_file(name, ".f16.npy"), vectors.astype('float16'))
+        write_chunk_store(self._segment_file(name, ".chunks"), documents)
+        write_lexical_index(self._segment_file(name, ".bm25"), [doc.page_content for doc in documents])
+        return index_type
+
+    def _describe_files(self, name: str) -> Dict[str, Dict[str, Any]]:
+        """Size and checksum of every file of a freshly written segment"""
+        files = {}
+        for path in sorted(self.segments_dir.glob(f"{name}.*")):
+            suffix = path.name[len(name):]
+            files[suffix] = {"bytes": disk_size(path), "sha256": file_checksum(path)}
+        return files
+
+    def _open_chunks(self, name: str) -> Any:
+        """Columnar chunk store of a segment (pickled Document list for older segments)"""
+        columnar = self._segment_file(name, ".chunks")
+        if columnar.exists():
+            return ChunkStore(columnar)
+        with open(self._segment_file(name, ".pkl"), "rb") as f:
+            return pickle.load(f)
+
+    def _read_segment_rows(self, name: str):
+        return self._open_chunks(name), np.load(self._segment_file(name, ".npy"), mmap_mode='r')
+
+    @staticmethod
+    def _live_rows(seg: Dict[str, Any]) -> List[int]:
+        rows: List[int] = []
+        for key, (start, end) in sorted(seg["docs"].items(), key=lambda kv: kv[1][0]):
+            if key not in seg["dead"]:
+                rows.extend(range(start, end))
+        return rows
+
+    @staticmethod
+    def _dead_rows(seg: Dict[str, Any]) -> int:
+        return sum(end - start for key, (start, end) in seg["docs"].items() if key in seg["dead"])
+
+    def _tombstone(self, catalog: Dict[str, Any], doc_key: str) -> bool:
+        """Mark doc_key dead in every segment; drop segments with nothing left.
+
+        doc_key also releases its references to shared chunks; a shared chunk
+        no live document refers to any more is tombstoned with it.
+        """
+        keys = {doc_key}
+        shared = catalog.get("shared", {})
+        for key in list(shared):
+            if doc_key in shared[key]:
+                del shared[key][doc_key]
+                if not shared[key]:
+                    del shared[key]
+                    keys.add(key)
+        found = len(keys) > 1
+        survivors = []
+        for seg in catalog["segments"]:
+            for key in keys:
+                if key in seg["docs"] and key not in seg["dead"]:
+                    seg["dead"].append(key)
+                    found = found or key == doc_key
+            if self._dead_rows(seg) < seg["rows"]:
+                survivors.append(seg)
+        catalog["segments"] = survivors
+        return found
+
+    # ---- writes --------------------------------------------------------
+
+    def upsert(
+        self,
+        doc_key: str,
+        documents: List[Document],
+        vectors: np.ndarray
+    ) -> str:
+        """Write documents as a new segment, replacing any older copy of doc_key"""
+        return self._add_segment(doc_key, documents, vectors, replace=True)
+
+    def append(
+        self,
+        doc_key: str,
+        documents: List[Document],
+        vectors: np.ndarray
+    ) -> str:
+        """Write more chunks of doc_key as a new segment, keeping its existing ones.
+
+        Streaming ingestion upserts the first part of a large document and
+        appends the rest; nothing is visible to readers until publish().
+        """
+        return self._add_segment(doc_key, documents, vectors, replace=False)
+
+    def _add_segment(
+        self,
+        doc_key: str,
+        documents: List[Document],
+        vectors: np.ndarray,
+        replace: bool
+    ) -> str:
+        with self._lock:
+            catalog = self.read_catalog()
+            if replace:
+                self._tombstone(catalog, doc_key)
+            name = self._append_segment(catalog, {doc_key: [0, len(documents)]}, documents, vectors)
+            self._write_catalog(catalog)
+        print(f"🐞 [SegmentStore] {'Upserted' if replace else 'Appended'} {doc_key} "
+              f"as {name} ({len(documents)} chunks)")
+        return name
+
+    def _append_segment(
+        self,
+        catalog: Dict[str, Any],
+        doc_ranges: Dict[str, List[int]],
+        documents: List[Document],
+        vectors: np.ndarray
+    ) -> str:
+        """Write a segment and add it to catalog; the caller holds the lock and writes the catalog"""
+        vectors = np.ascontiguousarray(vectors, dtype='float32')
+        name = f"seg-{catalog['next_id']:06d}"
+        metric = self._resolve_metric(catalog)
+        index_type = self._write_segment(name, documents, vectors, metric)
+        catalog["next_id"] += 1
+        catalog["dimension"] = int(vectors.shape[1])
+        catalog["segments"].append({
+            "name": name,
+            "index_type": index_type,
+            "rows": len(documents),
+            "docs": doc_ranges,
+            "dead": [],
+            "files": self._describe_files(name)
+        })
+        return name
+
+    def add_shared(
+        self,
+        documents: List[Document],
+        vectors: np.ndarray,
+        refs: List[Dict[str, List[Dict[str, Any]]]]
+    ) -> int:
+        """Store canonical chunks that several documents contain, once each.
+
+        documents carry metadata['shared_key']; refs[i] maps each document key
+        containing documents[i] to its citations there. A chunk that is already
+        stored only gains the new references. Deleting or replacing a document
+        releases its references, and the chunk is tombstoned with the last one.
+        The stored row keeps the metadata of the copy it was taken from, which is
+        what metadata filters see; citations are resolved from the references.
+        Returns the number of rows written.
+        """
+        with self._lock:
+            catalog = self.read_catalog()
+            shared = catalog.setdefault("shared", {})
+            rows: List[int] = []
+            for row, (doc, doc_refs) in enumerate(zip(documents, refs)):
+                key = doc.metadata["shared_key"]
+                if key not in shared:
+                    rows.append(row)
+                shared.setdefault(key, {}).update(doc_refs)
+            if rows:
+                name = self._append_segment(
+                    catalog,
+                    {documents[row].metadata["shared_key"]: [i, i + 1] for i, row in enumerate(rows)},
+                    [documents[row] for row in rows],
+                    np.asarray(vectors)[rows]
+                )
+            self._write_catalog(catalog)
+        if rows:
+            print(f"🐞 [SegmentStore] Stored {len(rows)} shared chunks as {name} "
+                  f"({len(documents) - len(rows)} already stored)")
+        return len(rows)
+
+    def delete(self, doc_key: str) -> bool:
+        """Tombstone every chunk of doc_key"""
+        with self._lock:
+            catalog = self.read_catalog()
+            found = self._tombstone(catalog, doc_key)
+            if found:
+                self._write_catalog(catalog)
+        if found:
+            print(f"🐞 [SegmentStore] Deleted {doc_key}")
+        return found
+
+    def commit_staged(self, doc_key: str) -> bool:
+        """Replace doc_key by its staged version in one catalog write.
+
+        The old version stays live until this point, so a document that fails
+        half-way through ingestion never removes what was there before.
+        """
+        staged = staging_key(doc_key)
+        with self._lock:
+            catalog = self.read_catalog()
+            if not any(staged in seg["docs"] for seg in catalog["segments"]):
+                return False
+            self._tombstone(catalog, doc_key)
+            for seg in catalog["segments"]:
+                # Staged parts are excluded from compaction, so they are never
+                # merged with another version of doc_key
+                if staged in seg["docs"]:
+                    seg["docs"][doc_key] = seg["docs"].pop(staged)
+                    seg["dead"] = [doc_key if key == staged else key for key in seg["dead"]]
+            self._write_catalog(catalog)
+        print(f"🐞 [SegmentStore] Committed staged {doc_key}")
+        return True
+
+    def discard_staged(self) -> List[str]:
+        """Tombstone every staged document, e.g. left over by an interrupted ingestion"""
+        with self._lock:
+            catalog = self.read_catalog()
+            keys = sorted({key for seg in catalog["segments"] for key in seg["docs"]
+                           if key.startswith(STAGING_PREFIX) and key not in seg["dead"]})
+            for key in keys:
+                self._tombstone(catalog, key)
+            if keys:
+                self._write_catalog(catalog)
+        if keys:
+            print(f"🐞 [SegmentStore] Discarded staged {keys}")
+        return keys
+
+    def import_legacy(self, index: Any, chunks: List[Document]) -> None:
+        """Migrate a single-file index.faiss/index.pkl store into segments"""
+        vectors = index.reconstruct_n(0, index.ntotal)
+        by_doc: Dict[str, List[int]] = {}
+        for row, doc in enumerate(chunks):
+            by_doc.setdefault(document_key(doc), []).append(row)
+        for key, rows in by_doc.items():
+            self.upsert(key, [chunks[r] for r in rows], vectors[rows])
+
+    # ---- compaction ----------------------------------------------------
+
+    def _compaction_candidates(self, catalog: Dict[str, Any], force: bool) -> List[Dict[str, Any]]:
+        # Staged documents are merged only after commit_staged() renamed them
+        settled = [s for s in catalog["segments"] if not any(k.startswith(STAGING_PREFIX) for k in s["docs"])]
+        small = [s for s in settled if s["rows"] < SMALL_SEGMENT_ROWS]
+        dirty = [s for s in settled
+                 if s not in small and self._dead_rows(s) > MAX_DEAD_RATIO * s["rows"]]
+        candidates = small + dirty if force or len(small) >= COMPACTION_TRIGGER else dirty
+        # Rewriting a single clean segment would be a no-op
+        if len(candidates) == 1 and not candidates[0]["dead"]:
+            return []
+        return candidates
+
+    def compact(self, force: bool = False) -> Optional[str]:
+        """Merge small segments and drop tombstoned rows. Returns the new segment name."""
+        key = str(self.path.absolute())
+        with _REGISTRY_LOCK:
+            if key in _COMPACTING:
+                print("🐞 [SegmentStore] Compaction already running")
+                return None
+            _COMPACTING.add(key)
+        try:
+            return self._compact(force)
+        finally:
+            with _REGISTRY_LOCK:
+                _COMPACTING.discard(key)
+
+    def _compact(self, force: bool) -> Optional[str]:
+        with self._lock:
+            catalog = self.read_catalog()
+            candidates = self._compaction_candidates(catalog, force)
+            if not candidates:
+                return None
+            name = f"seg-{catalog['next_id']:06d}"
+            catalog["next_id"] += 1
+            self._write_catalog(catalog, changed=False)
+            self._pending.add(name)
+
+        try:
+            # The expensive merge runs without holding the writer lock
+            # A document appended in several parts may span candidates; its rows
+            # are gathered first so it gets one contiguous range in the merge
+            parts: Dict[str, List[tuple]] = {}
+            for seg in candidates:
+                chunks, vectors = self._read_segment_rows(seg["name"])
+                for doc_key, (start, end) in sorted(seg["docs"].items(), key=lambda kv: kv[1][0]):
+                    if doc_key in seg["dead"]:
+                        continue
+                    parts.setdefault(doc_key, []).append((chunks[start:end], vectors[start:end]))
+
+            merged_docs: List[Document] = []
+            merged_vectors: List[np.ndarray] = []
+            doc_ranges: Dict[str, List[int]] = {}
+            for doc_key, pieces in parts.items():
+                start = len(merged_docs)
+                for chunks, vectors in pieces:
+                    merged_docs.extend(chunks)
+                    merged_vectors.append(vectors)
+                doc_ranges[doc_key] = [start, len(merged_docs)]
+
+            if merged_docs:
+                index_type = self._write_segment(
+                    name, merged_docs, np.concatenate(merged_vectors), catalog.get("metric", "l2")
+                )
+                files = self._describe_files(name)
+
+            with self._lock:
+                catalog = self.read_catalog()
+                current = {s["name"]: s for s in catalog["segments"]}
+                # Carry over tombstones written while the merge was running, for the
+                # documents each candidate contributed; rows that were already dead
+                # were left out of the merge. A candidate that vanished from the
+                # catalog had every document tombstoned.
+                dead = set()
+                for seg in candidates:
+                    contributed = set(seg["docs"]) - set(seg["dead"])
+                    now = current.get(seg["name"])
+                    dead.update(contributed if now is None else contributed & set(now["dead"]))
+
+                merged_names = {s["name"] for s in candidates}
+                segments = [s for s in catalog["segments"] if s["name"] not in merged_names]
+                if len(dead) < len(doc_ranges):
+                    segments.append({
+                        "name": name,
+                        "index_type": index_type,
+                        "rows": len(merged_docs),
+                        "docs": doc_ranges,
+                        "dead": sorted(dead),
+                        "files": files
+                    })
+                catalog["segments"] = segments
+                self._write_catalog(catalog, changed=False)
+        finally:
+            self._pending.discard(name)
+
+        self.collect_garbage()
+        print(f"🐞 [SegmentStore] Compacted {len(candidates)} segments into {name}")
+        return name
+
+    def has_unpublished_writes(self) -> bool:
+        """Whether the working catalog holds writes the current snapshot does not"""
+        current = self.current_snapshot()
+        published = self.read_snapshot(current).get("writes", 0) if current else -1
+        return self.read_catalog().get("writes", 0) != published
+
+    def compact_in_background(self) -> threading.Thread:
+        """Run compact() on a worker thread and publish the merged layout.
+
+        Writers return without waiting for the merge. The thread is not a
+        daemon, so a batch process finishes the merge before it exits. The
+        result is published as its own snapshot unless a writer has unpublished
+        changes; that writer's publish then carries the merged layout.
+        """
+        def _run():
+            try:
+                if self.compact() is None:
+                    return
+                with self._lock:
+                    if self.has_unpublished_writes():
+                        print("🐞 [SegmentStore] Compaction left for the next publish")
+                        return
+                    self.publish()
+            except Exception as e:
+                print(f"❌ [SegmentStore] Background compaction failed: {str(e)}")
+
+        thread = threading.Thread(target=_run, name=f"compact-{self.path.parent.name}")
+        thread.start()
+        return thread
+
+    def collect_garbage(self) -> None:
+        """Remove segment files no longer referenced by the catalog"""
+        if not self.segments_dir.exists():
+            return
+        with self._lock:
+            live = {s["name"] for s in self.read_catalog()["segments"]} | self._pending
+            # Segments of retained snapshots stay loadable for servers still on them
+            for snapshot in self._retained_snapshots():
+                try:
+                    with open(snapshot, "r", encoding="utf-8") as f:
+                        live.update(s["name"] for s in json.load(f)["segments"])
+                except (OSError, ValueError):
+                    continue
+            for path in self.segments_dir.iterdir():
+                if path.name.split(".")[0] in live:
+                    continue
+                try:
+                    if path.is_dir():
+                        shutil.rmtree(path)
+                    else:
+                        path.unlink()
+                except OSError:
+                    # Still open in another process (e.g. Windows); retried on next GC
+                    pass
+
+    # ---- reads ---------------------------------------------------------
+
+    def iter_live_vectors(self, catalog: Optional[Dict[str, Any]] = None):
+        """Yield (segment name, live row ids, float32 vectors of those rows).
+
+        catalog defaults to the working catalog; pass a snapshot's catalog to
+        read exactly what a loaded retriever serves.
+        """
+        for seg in (catalog or self.read_catalog())["segments"]:
+            vectors = np.load(self._segment_file(seg["name"], ".npy"), mmap_mode='r')
+            rows = np.array(self._live_rows(seg), dtype='int64')
+            yield seg["name"], rows, np.asarray(vectors[rows], dtype='float32')
+
+    def live_vectors(self) -> np.ndarray:
+        """Stored vectors of every live row, in catalog order"""
+        blocks = [vectors for _, _, vectors in self.iter_live_vectors()]
+        return np.concatenate(blocks) if blocks else np.empty((0, 0), dtype='float32')
+
+    def load_segments(
+        self,
+        mmap: bool = False,
+        prefault_pages: bool = False,
+        catalog: Optional[Dict[str, Any]] = None,
+        backend: str = "faiss"
+    ) -> List[Segment]:
+        """Load every live segment of a catalog (the working catalog by default).
+
+        mmap maps the index files read-only instead of copying them to the heap;
+        prefault_pages reads all segment files once at startup to warm the page cache.
+        backend="numpy" skips the FAISS indexes and searches the stored vectors
+        exactly (the float16 copy when the segment has one, float32 otherwise).
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}'. Must be one of: {BACKENDS}")
+        catalog = catalog if catalog is not None else self.read_catalog()
+        if prefault_pages:
+            paths = [p for seg in catalog["segments"]
+                     for p in self.segments_dir.glob(f"{seg['name']}.*")
+                     if not p.name.endswith(".npy") or p.name.endswith(".f16.npy")]
+            print(f"🐞 [SegmentStore] Prefaulted {prefault(paths) / 1e6:.1f} MB")
+        segments = []
+        for seg in catalog["segments"]:
+            side_path = self._segment_file(seg["name"], ".f16.npy")
+            if backend == "numpy":
+                vectors_path = side_path if side_path.exists() else self._segment_file(seg["name"], ".npy")
+                index = NumpyIndex.load(vectors_path, catalog.get("metric", "l2"), mmap=mmap)
+            else:
+                index = read_index(self._segment_file(seg["name"], ".faiss"), mmap=mmap,
+                                   index_type=seg.get("index_type"))
+            chunks = self._open_chunks(seg["name"])
+            live_ids = None
+            if seg["dead"]:
+                live_ids = np.array(self._live_rows(seg), dtype='int64')
+            side_vectors = None
+            if backend == "faiss" and side_path.exists():
+                side_vectors = np.load(side_path, mmap_mode='r')
+            lexical = None
+            lexical_path = self._segment_file(seg["name"], ".bm25")
+            if lexical_path.exists():
+                lexical = LexicalIndex.read(lexical_path)
+            segments.append(Segment(seg["name"], index, chunks, live_ids, side_vectors, lexical))
+        return segments
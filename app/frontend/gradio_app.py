@@ -23,7 +23,11 @@ from app.backend.utils.notifications import NotificationService
 from app.backend.llm.llm_factory import get_llm, get_domain_prompt
 from app.backend.pipeline.qa_chain import build_qa_chain
 from app.backend.vector_store.faiss_store import load_faiss_index
-from app.backend.retriever.pdf.splitter import get_embedder
+from app.backend.vector_store.hot_reload import ReloadingRetriever
+from app.backend.vector_store.query_cache import QueryCache
+from app.backend.vector_store.segment_store import SegmentStore
+from app.backend.retriever.pdf.splitter import get_embedder, embedder_stats
+from app.backend.retriever.reranker import CrossEncoderReranker, DEFAULT_RERANK_MODEL
 from app.backend.domains.validator import DomainValidator
 from app.backend.retriever.dispatcher import ToolDispatcher
 from app.backend.tools.tool_factory import get_tool
@@ -80,15 +84,27 @@ def initialize_application():
         required_paths = {
             "PDF": Path("app/data/domains/hr/EmployeeHandbook.pdf"),
             "Vectorstore": Path("app/data/domains/hr/vectorstore"),
+        }
+        # Either the segment catalog or a legacy single-file index
+        index_paths = {
+            "Segment catalog": Path("app/data/domains/hr/vectorstore/segments.json"),
             "FAISS index": Path("app/data/domains/hr/vectorstore/index.faiss"),
-            "PKL metadata": Path("app/data/domains/hr/vectorstore/index.pkl")
         }
         
         print("\n=== Path Verification ===")
-        for name, path in required_paths.items():
+        for name, path in {**required_paths, **index_paths}.items():
             print(f"{name}: {path.exists()} at {path.absolute()}")
         
-        return all(path.exists() for path in required_paths.values())
+        # Published stores are checked against their manifest without loading anything
+        store = SegmentStore(required_paths["Vectorstore"])
+        if store.current_snapshot() is not None:
+            problems = store.verify()
+            for problem in problems:
+                print(f"❌ Manifest check: {problem}")
+            return required_paths["PDF"].exists() and not problems
+        
+        return (all(path.exists() for path in required_paths.values())
+                and any(path.exists() for path in index_paths.values()))
 
     if not verify_paths():
         raise RuntimeError("Required files missing - check path verification above")
@@ -247,12 +263,30 @@ def initialize_components():
             print(f"\nLoading FAISS index from: {VECTORSTORE_PATH}")
             print(f"Contents of vectorstore: {os.listdir(VECTORSTORE_PATH) if VECTORSTORE_PATH.exists() else 'DIRECTORY NOT FOUND'}")
             
-            retriever = load_faiss_index(
-                get_embedder(),
+            # mmap keeps one shared copy of the vectors across worker processes; the
+            # wrapper reloads the retriever whenever a new snapshot is published and
+            # the query cache is shared so cached embeddings survive reloads
+            query_cache = QueryCache()
+            retriever = ReloadingRetriever(
+                lambda: load_faiss_index(
+                    get_embedder(),
+                    str(VECTORSTORE_PATH),
+                    search_kwargs={
+                        'k': 3,
+                        'score_threshold': 'auto',
+                        # "mmr" keeps overlapping slices of one page from filling all k slots
+                        'search_type': os.getenv("RETRIEVAL_SEARCH_TYPE", "similarity")
+                    },
+                    mmap=True,
+                    prefault=os.getenv("VECTORSTORE_PREFAULT", "0") == "1",
+                    backend=os.getenv("VECTORSTORE_BACKEND", "faiss"),
+                    query_cache=query_cache
+                ),
                 str(VECTORSTORE_PATH),
-                search_kwargs={'k': 3, 'score_threshold': 0.85}
+                poll_interval=float(os.getenv("VECTORSTORE_POLL_SECONDS", "5"))
             )
             print("✅ FAISS index loaded successfully")
+            debug_print(f"🐞 Embedders in memory: {embedder_stats()}")
         except Exception as e:
             print(f"❌ Failed to load FAISS index: {str(e)}")
             raise
@@ -263,10 +297,17 @@ def initialize_components():
         if retriever is None:
             raise RuntimeError("Retriever was not properly initialized")
 
+        # Optional cross-encoder stage: over-fetch, re-score, keep the best 3
+        reranker = None
+        if os.getenv("RETRIEVAL_RERANK", "0") == "1":
+            reranker = CrossEncoderReranker(os.getenv("RERANK_MODEL", DEFAULT_RERANK_MODEL))
+            debug_print(f"🐞 Re-ranking enabled with {reranker.model_name}")
+
         qa_chain = build_qa_chain(
             llm=get_llm(),
             retriever=retriever,
-            company_name=COMPANY_NAME
+            company_name=COMPANY_NAME,
+            reranker=reranker
         )
         print("✅ QA chain built successfully")
 
@@ -298,20 +339,23 @@ def format_response(response_data: Dict[str, Any]) -> str:
         # Process citations
         citation_links = []
         for doc in sources:
-            filename = doc.metadata.get('filename', '')
-            page = doc.metadata.get('page_number', '')
-            
-            if filename and page:
-                if not filename.lower().endswith('.pdf'):
-                    filename += '.pdf'
+            # Deduplicated chunks cite every place their text appears
+            citations = doc.metadata.get('citations') or [doc.metadata]
+            for citation in citations:
+                filename = citation.get('filename', '')
+                page = citation.get('page_number', '')
                 
-                prefix = filename[:2].upper()
-                pdf_url = f"/api/v1/pdf/open?filename={quote(filename)}&page={page}"
-                
-                citation_links.append(
-                    f'<a href="{pdf_url}" target="_blank" '
-                    f'class="page-link">{prefix}-{page}</a>'
-                )
+                if filename and page:
+                    if not filename.lower().endswith('.pdf'):
+                        filename += '.pdf'
+                    
+                    prefix = filename[:2].upper()
+                    pdf_url = f"/api/v1/pdf/open?filename={quote(filename)}&page={page}"
+                    
+                    link = (f'<a href="{pdf_url}" target="_blank" '
+                            f'class="page-link">{prefix}-{page}</a>')
+                    if link not in citation_links:
+                        citation_links.append(link)
         
         # Add citations if available
         if citation_links:
@@ -405,7 +449,7 @@ async def chat_respond(message: str, history: List[List[str]]) -> Iterator[List[
         print(f"Notification service enabled: {notifier._enabled}")
         print(f"Detector initialized: {hasattr(notifier, 'detector')}")
         
-        response = generate_response(message)
+        response = await asyncio.to_thread(generate_response, message)
         print(f"Raw response: {response}")
         
         # Add this debug before notification
@@ -963,8 +1007,9 @@ def create_chat_interface():
                             chat_history.append({"role": "assistant", "content": "▌"})
                             yield chat_history, ""
                             
-                            # Get response with full chat history context
-                            response = generate_response(message, chat_history)
+                            # Get response with full chat history context; runs off the
+                            # event loop so concurrent users overlap retrieval and generation
+                            response = await asyncio.to_thread(generate_response, message, chat_history)
                             answer = format_response(response) if isinstance(response, dict) else str(response)
                             
                             # Stream response
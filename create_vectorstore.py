@@ -1,11 +1,10 @@
 import sys
+import argparse
 import logging
 from pathlib import Path
-from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
 sys.path.insert(0, str(Path(__file__).parent))
 
-from app.backend.pipeline.preprocess import process_pdf
+from app.backend.pipeline.ingest_manifest import ingest_directory
 from app.backend.config.config import current_config
 from app.backend.domains.manager import DomainManager
 
@@ -17,77 +16,47 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def get_last_processed_time(log_file='vectorstore.log'):
-    """Get the last processing time from log file"""
-    try:
-        with open(log_file, 'r') as f:
-            for line in reversed(list(f)):
-                if 'Completed processing' in line:
-                    return datetime.strptime(line.split(' - ')[0], '%Y-%m-%d %H:%M:%S,%f')
-    except FileNotFoundError:
-        return datetime.min
-    return datetime.min
-
-def process_pdf_wrapper(pdf_file, domain):
-    """Wrapper function for parallel processing"""
-    try:
-        logger.info(f"Starting processing: {pdf_file.name}")
-        start_time = datetime.now()
-        
-        output_dir = process_pdf(str(pdf_file), domain)
-        
-        duration = (datetime.now() - start_time).total_seconds()
-        logger.info(f"Completed processing {pdf_file.name} in {duration:.2f}s")
-        return True, pdf_file.name
-    except Exception as e:
-        logger.error(f"Failed to process {pdf_file.name}: {str(e)}")
-        return False, pdf_file.name
-
-def process_all_hr_pdfs():
-    """Process all PDFs in the HR domain folder"""
+def process_all_hr_pdfs(workers=None, threads_per_worker=1, dry_run=False):
+    """Process new and changed PDFs in the HR domain folder and drop removed ones"""
     domain = "hr"
     DomainManager.switch_domain(domain)
     hr_pdf_dir = Path("app/data/domains/hr")
-    vectorstore_dir = hr_pdf_dir / "vectorstore"
 
     # Validate paths
     if not hr_pdf_dir.exists():
         logger.error(f"HR directory not found at {hr_pdf_dir}")
         return False
 
-    # Get PDFs modified since last run
-    last_processed = get_last_processed_time()
-    pdf_files = [f for f in hr_pdf_dir.glob("*.pdf") 
-                if f.stat().st_mtime > last_processed.timestamp()]
-    
-    if not pdf_files:
-        logger.info("No new or modified PDFs found since last run")
+    # The ingestion manifest (vectorstore/ingested.json) decides what to do; see ingest_directory
+    result = ingest_directory(hr_pdf_dir, domain, workers=workers,
+                              threads_per_worker=threads_per_worker, dry_run=dry_run)
+    plan = result["plan"]
+    if dry_run:
+        return True
+    if not (plan["new"] or plan["changed"] or plan["removed"]):
+        logger.info("No new, modified or removed PDFs since last run")
         return True
 
-    logger.info(f"Found {len(pdf_files)} PDFs to process:")
-    for pdf in pdf_files:
-        logger.info(f"- {pdf.name} (modified: {datetime.fromtimestamp(pdf.stat().st_mtime)})")
-
-    # Process in parallel (4 workers)
-    success_count = 0
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        futures = [executor.submit(process_pdf_wrapper, pdf, domain) 
-                  for pdf in pdf_files]
-        
-        for future in as_completed(futures):
-            success, filename = future.result()
-            if success:
-                success_count += 1
-                print(f"✓ {filename}")
-            else:
-                print(f"✗ {filename}")
+    for name in plan["removed"]:
+        logger.info(f"Removed {name} from the vectorstore")
+    for name in result["processed"]:
+        logger.info(f"Completed processing {name}")
+    for failed in result["failed"]:
+        logger.error(f"Failed to process {failed['pdf']}: {failed['error']}")
 
-    logger.info(f"Processing complete. {success_count}/{len(pdf_files)} files succeeded")
-    return success_count == len(pdf_files)
+    to_process = len(plan["new"]) + len(plan["changed"])
+    logger.info(f"Processing complete. {len(result['processed'])}/{to_process} files succeeded")
+    return not result["failed"]
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process HR PDFs into the vectorstore")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: half the CPUs, max 4)")
+    parser.add_argument("--threads", type=int, default=1, help="Math-library threads per worker")
+    parser.add_argument("--dry-run", action="store_true", help="Print what would be added, re-embedded or removed")
+    args = parser.parse_args()
+
     print("=== Starting PDF Processing ===")
-    if process_all_hr_pdfs():
+    if process_all_hr_pdfs(workers=args.workers, threads_per_worker=args.threads, dry_run=args.dry_run):
         print("\n✅ All files processed successfully")
     else:
         print("\n⚠️ Some files failed to process (check vectorstore.log)")
@@ -0,0 +1,58 @@
+import tempfile
+import numpy as np
+from langchain_core.documents import Document
+
+from app.backend.vector_store.segment_store import SegmentStore
+
+DIM = 8
+
+
+def _chunks(filename, n, version=0):
+    docs = [Document(page_content=f"{filename} v{version} chunk {i}", metadata={'filename': filename, 'chunk_id': i})
+            for i in range(n)]
+    vectors = np.random.default_rng(len(filename) + version).random((n, DIM), dtype='float32')
+    return docs, vectors
+
+
+def test_reupsert_then_compact():
+    """A re-ingested document must stay live when its old copy is merged in the same compaction"""
+    with tempfile.TemporaryDirectory() as path:
+        store = SegmentStore(path, index_type="flat")
+        for i in range(6):
+            store.upsert(f"f{i}.pdf", *_chunks(f"f{i}.pdf", 10))
+        # The old copy of f3 now shares a segment with live documents
+        store.compact(force=True)
+        store.upsert("f3.pdf", *_chunks("f3.pdf", 10, version=1))
+        store.compact(force=True)
+
+        assert store.documents() == {f"f{i}.pdf": 10 for i in range(6)}
+        segments = store.read_catalog()["segments"]
+        assert len(segments) == 1 and not segments[0]["dead"]
+        chunks = store.load_segments()[0].chunks
+        start, end = segments[0]["docs"]["f3.pdf"]
+        assert all(" v1 " in chunks[row].page_content for row in range(start, end))
+
+
+def test_delete_during_compaction():
+    """A document deleted while the merge runs is tombstoned in the merged segment"""
+    with tempfile.TemporaryDirectory() as path:
+        store = SegmentStore(path, index_type="flat")
+        for i in range(4):
+            store.upsert(f"f{i}.pdf", *_chunks(f"f{i}.pdf", 10))
+        read_rows = store._read_segment_rows
+
+        def read_and_delete(name):
+            store.delete("f1.pdf")
+            return read_rows(name)
+
+        store._read_segment_rows = read_and_delete
+        store.compact(force=True)
+
+        assert store.documents() == {"f0.pdf": 10, "f2.pdf": 10, "f3.pdf": 10}
+        assert store.read_catalog()["segments"][0]["dead"] == ["f1.pdf"]
+
+
+if __name__ == "__main__":
+    test_reupsert_then_compact()
+    test_delete_during_compaction()
+    print("✅ Compaction keeps re-ingested documents and carries over new tombstones")
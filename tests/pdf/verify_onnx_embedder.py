@@ -0,0 +1,41 @@
+import numpy as np
+
+from app.backend.retriever.pdf.splitter import DEFAULT_EMBEDDING_MODEL, get_embedder
+from app.backend.retriever.pdf.onnx_embeddings import OnnxEmbeddings, cosine_agreement
+
+# The ONNX backend stays experimental (never the default) until this check passes.
+# int8 dynamic quantization should keep every vector nearly parallel to the PyTorch one
+MIN_MEAN_COSINE = 0.99
+MIN_COSINE = 0.98
+
+SAMPLE_TEXTS = [
+    "How many vacation days do new employees get?",
+    "Employees accrue 1.5 days of paid time off per month of service.",
+    "Expense reports must be submitted within 30 days of the purchase date.",
+    "The company matches 401(k) contributions up to 5% of base salary.",
+    "Remote work requests are approved by the direct manager and HR.",
+    "Sick leave does not carry over into the next calendar year.",
+    "Parental leave",
+    "What is the dress code for client meetings? " * 20,
+]
+
+def verify_onnx_embedder():
+    reference = get_embedder(DEFAULT_EMBEDDING_MODEL, backend="torch")
+    candidate = OnnxEmbeddings(DEFAULT_EMBEDDING_MODEL, quantized=True)
+
+    agreement = cosine_agreement(reference, candidate, SAMPLE_TEXTS)
+    print(f"Documents: mean cosine {agreement['mean']:.4f}, min {agreement['min']:.4f}")
+
+    # Both vectors are L2-normalized, so the dot product is the cosine
+    query = SAMPLE_TEXTS[0]
+    query_cosine = float(np.dot(reference.embed_query(query), candidate.embed_query(query)))
+    print(f"Query: cosine {query_cosine:.4f}")
+
+    return (agreement["mean"] >= MIN_MEAN_COSINE and agreement["min"] >= MIN_COSINE
+            and query_cosine >= MIN_COSINE)
+
+if __name__ == "__main__":
+    if verify_onnx_embedder():
+        print("✅ ONNX embedder matches PyTorch vectors")
+    else:
+        print("❌ ONNX embedder diverges from PyTorch vectors")
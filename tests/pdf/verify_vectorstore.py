@@ -2,9 +2,38 @@ from pathlib import Path
 import faiss
 import pickle
 
+from app.backend.vector_store.segment_store import SegmentStore
+from app.backend.vector_store.manifest import load_manifest
+
 def verify_vectorstore():
     vs_path = Path("app/data/domains/hr/vectorstore")
-    
+    store = SegmentStore(vs_path)
+
+    # Published stores: manifest only, no index is deserialized
+    manifest = load_manifest(vs_path)
+    if manifest is not None:
+        problems = store.verify()
+        for problem in problems:
+            print(problem)
+        print(f"Vectorstore contains {manifest['vectors']} vectors "
+              f"(dim {manifest['dimension']}, {manifest['embedder']})")
+        for filename, count in manifest["documents"].items():
+            print(f"  {filename}: {count} chunks")
+        return not problems
+
+    # Segment layout
+    if store.exists():
+        try:
+            segments = store.load_segments()
+            print(f"Vectorstore contains {len(segments)} segments")
+            print(f"Live chunks: {sum(s.live_count for s in segments)}")
+            for filename, count in store.documents().items():
+                print(f"  {filename}: {count} chunks")
+            return True
+        except Exception as e:
+            print(f"Error loading vectorstore: {str(e)}")
+            return False
+
     # Check files exist
     if not (vs_path/"index.faiss").exists():
         print("Missing index.faiss file")
@@ -18,7 +47,7 @@ def verify_vectorstore():
         index = faiss.read_index(str(vs_path/"index.faiss"))
         with open(vs_path/"index.pkl", "rb") as f:
             metadata = pickle.load(f)
-        
+
         print(f"Vectorstore contains {index.ntotal} vectors")
         print(f"Metadata has {len(metadata['chunks'])} documents")
         return True
@@ -30,4 +59,4 @@ if __name__ == "__main__":
     if verify_vectorstore():
         print("✅ Vectorstore is valid")
     else:
-        print("❌ Vectorstore verification failed")
\ No newline at end of file
+        print("❌ Vectorstore verification failed")